@@ -0,0 +1,149 @@
+import os
+import json
+import time
+
+# OpenAI 兼容 Batch API：请求写成 JSONL 上传，服务端离线跑完后再下载结果文件
+BATCH_ENDPOINT = "/v1/chat/completions"
+BATCH_DIR = "batch_jobs"
+MANIFEST_NAME = "manifest.json"
+# 单个输入文件的上限（OpenAI 200MB / 50000 行，DashScope 500MB），留一点余量
+DEFAULT_MAX_FILE_MB = 190
+DEFAULT_MAX_REQUESTS = 50000
+TERMINAL_STATUSES = ('completed', 'failed', 'expired', 'cancelled')
+
+def manifest_path(batch_dir):
+    return os.path.join(batch_dir, MANIFEST_NAME)
+
+def load_manifest(batch_dir):
+    path = manifest_path(batch_dir)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def save_manifest(batch_dir, manifest):
+    path = manifest_path(batch_dir)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+def is_finished(manifest):
+    return bool(manifest) and all(shard.get('collected') for shard in manifest['shards'])
+
+def write_shards(requests, batch_dir, max_file_mb=DEFAULT_MAX_FILE_MB, max_requests=DEFAULT_MAX_REQUESTS):
+    """
+    Stream (custom_id, body, meta) triples into batch JSONL files under
+    `batch_dir`, starting a new shard whenever the provider's size or line
+    limit would be exceeded. `meta` is kept in the manifest so results can
+    be routed back without re-scanning the inputs.
+    """
+    os.makedirs(batch_dir, exist_ok=True)
+    max_bytes = int(max_file_mb * 1024 * 1024)
+    manifest = {'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'), 'shards': []}
+    shard, f, size = None, None, 0
+    try:
+        for custom_id, body, meta in requests:
+            line = json.dumps({
+                'custom_id': custom_id, 'method': 'POST', 'url': BATCH_ENDPOINT, 'body': body,
+            }, ensure_ascii=False).encode('utf-8') + b"\n"
+            if shard is None or (shard['requests'] and (size + len(line) > max_bytes or len(shard['requests']) >= max_requests)):
+                if f is not None:
+                    f.close()
+                shard = {'file': f"shard_{len(manifest['shards']):03d}.jsonl", 'requests': {}, 'batch_id': None}
+                manifest['shards'].append(shard)
+                f = open(os.path.join(batch_dir, shard['file']), 'wb')
+                size = 0
+            f.write(line)
+            size += len(line)
+            shard['requests'][custom_id] = meta
+    finally:
+        if f is not None:
+            f.close()
+    save_manifest(batch_dir, manifest)
+    return manifest
+
+def submit_shards(client, manifest, batch_dir, completion_window="24h"):
+    """Upload and start every shard that has no batch yet; the manifest is saved after each one so a crash never double-submits."""
+    for shard in manifest['shards']:
+        if shard['batch_id']:
+            continue
+        with open(os.path.join(batch_dir, shard['file']), 'rb') as f:
+            input_file = client.files.create(file=f, purpose="batch")
+        batch = client.batches.create(
+            input_file_id=input_file.id,
+            endpoint=BATCH_ENDPOINT,
+            completion_window=completion_window,
+            metadata={'shard': shard['file']},
+        )
+        shard.update({'input_file_id': input_file.id, 'batch_id': batch.id, 'status': batch.status})
+        save_manifest(batch_dir, manifest)
+        print(f"[Batch] Submitted {shard['file']} ({len(shard['requests'])} requests) -> {batch.id}")
+
+def poll_shards(client, manifest, batch_dir, interval=60.0):
+    """Block until every batch reaches a terminal status."""
+    while True:
+        pending = 0
+        for shard in manifest['shards']:
+            if shard.get('status') in TERMINAL_STATUSES:
+                continue
+            batch = client.batches.retrieve(shard['batch_id'])
+            counts = batch.request_counts
+            shard.update({
+                'status': batch.status,
+                'output_file_id': batch.output_file_id,
+                'error_file_id': batch.error_file_id,
+            })
+            if counts is not None:
+                print(f"[Batch] {shard['file']} {batch.status}: {counts.completed}/{counts.total} done, {counts.failed} failed")
+            if batch.status not in TERMINAL_STATUSES:
+                pending += 1
+        save_manifest(batch_dir, manifest)
+        if pending == 0:
+            return
+        time.sleep(interval)
+
+def download_lines(client, file_id, save_path):
+    if not file_id:
+        return []
+    text = client.files.content(file_id).text
+    with open(save_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+def collect_shards(client, manifest, batch_dir, on_result):
+    """
+    Download output and error files of finished shards and hand each
+    request to `on_result(meta, message, usage, error)`; `message` is the
+    assistant message dict or None. Expired or cancelled batches still
+    deliver the requests that did finish. Returns (succeeded, failed).
+    """
+    succeeded, failed = 0, 0
+    for shard in manifest['shards']:
+        if shard.get('collected') or shard.get('status') not in TERMINAL_STATUSES:
+            continue
+        stem = os.path.splitext(shard['file'])[0]
+        lines = download_lines(client, shard.get('output_file_id'), os.path.join(batch_dir, f"{stem}.output.jsonl"))
+        lines += download_lines(client, shard.get('error_file_id'), os.path.join(batch_dir, f"{stem}.errors.jsonl"))
+        seen = set()
+        for line in lines:
+            meta = shard['requests'].get(line.get('custom_id'))
+            if meta is None:
+                continue
+            seen.add(line['custom_id'])
+            response = line.get('response') or {}
+            body = response.get('body') or {}
+            if response.get('status_code') == 200 and body.get('choices'):
+                on_result(meta, body['choices'][0]['message'], body.get('usage'), None)
+                succeeded += 1
+            else:
+                error = line.get('error') or body.get('error') or f"HTTP {response.get('status_code')}"
+                on_result(meta, None, None, error)
+                failed += 1
+        for custom_id, meta in shard['requests'].items():
+            if custom_id not in seen:
+                on_result(meta, None, None, f"no result (batch {shard['status']})")
+                failed += 1
+        shard['collected'] = True
+        save_manifest(batch_dir, manifest)
+    return succeeded, failed
@@ -0,0 +1,131 @@
+import os
+import time
+import tempfile
+import argparse
+import numpy as np
+from PIL import Image
+from scipy.spatial import cKDTree
+
+from preprocess_ import generate_cut_masks, iter_cut_pieces
+
+def get_args():
+    parser = argparse.ArgumentParser(description="Micro-benchmark: Voronoi mask generation (legacy vs single-pass)")
+    parser.add_argument('--width', type=int, default=1600, help='Synthetic render width')
+    parser.add_argument('--height', type=int, default=6000, help='Synthetic render height')
+    parser.add_argument('--piece_counts', nargs='+', type=int, default=[8, 12, 16], help='Piece counts to benchmark')
+    parser.add_argument('--repeats', type=int, default=3, help='Runs per configuration (best is reported)')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed shared by both engines')
+    return parser.parse_args()
+
+def legacy_iter_cut_pieces(w, h, num_pieces):
+    # 原始实现：每个碎片做一次全分辨率比较、放大与 np.where 扫描
+    points = np.random.rand(num_pieces, 2) * [w, h]
+
+    scale = 0.5
+    small_w, small_h = int(w * scale), int(h * scale)
+    y_grid, x_grid = np.indices((small_h, small_w))
+    coords = np.stack((x_grid, y_grid), axis=-1).reshape(-1, 2)
+
+    tree = cKDTree(points * scale)
+    _, regions = tree.query(coords)
+    regions = regions.reshape(small_h, small_w)
+
+    for i in range(num_pieces):
+        small_mask = (regions == i).astype(np.uint8) * 255
+        mask_img = Image.fromarray(small_mask).resize((w, h), resample=Image.NEAREST)
+        mask_arr = np.array(mask_img)
+
+        rows, cols = np.where(mask_arr > 0)
+        if len(rows) == 0: continue
+
+        y_min, y_max = rows.min(), rows.max()
+        x_min, x_max = cols.min(), cols.max()
+
+        pad = 2
+        y_min, y_max = max(0, y_min - pad), min(h, y_max + pad)
+        x_min, x_max = max(0, x_min - pad), min(w, x_max + pad)
+
+        mask_crop = mask_arr[y_min:y_max, x_min:x_max]
+        yield i, (x_min, y_min, x_max, y_max), mask_crop
+
+def legacy_generate_cut_masks(base_img_path, output_dir, num_pieces):
+    img = Image.open(base_img_path)
+    w, h = img.size
+    os.makedirs(output_dir, exist_ok=True)
+
+    for i, box, mask_crop in legacy_iter_cut_pieces(w, h, num_pieces):
+        tex_crop = img.crop(box)
+
+        Image.fromarray(mask_crop).save(os.path.join(output_dir, f"mask_{i}.png"))
+        tex_crop.save(os.path.join(output_dir, f"tex_{i}.png"))
+
+def timed_run(fn, base_img_path, output_dir, num_pieces, seed, repeats):
+    best = float('inf')
+    for _ in range(repeats):
+        np.random.seed(seed)
+        start = time.perf_counter()
+        fn(base_img_path, output_dir, num_pieces)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def timed_engine(fn, w, h, num_pieces, seed, repeats):
+    best = float('inf')
+    pieces = None
+    for _ in range(repeats):
+        np.random.seed(seed)
+        start = time.perf_counter()
+        pieces = list(fn(w, h, num_pieces))
+        best = min(best, time.perf_counter() - start)
+    return best, pieces
+
+def pieces_identical(pieces_a, pieces_b):
+    if len(pieces_a) != len(pieces_b):
+        return False
+    for (i_a, box_a, mask_a), (i_b, box_b, mask_b) in zip(pieces_a, pieces_b):
+        if i_a != i_b or tuple(box_a) != tuple(box_b) or mask_a.tobytes() != mask_b.tobytes():
+            return False
+    return True
+
+def outputs_identical(dir_a, dir_b):
+    names_a = sorted(os.listdir(dir_a))
+    if names_a != sorted(os.listdir(dir_b)):
+        return False
+    for name in names_a:
+        arr_a = np.array(Image.open(os.path.join(dir_a, name)))
+        arr_b = np.array(Image.open(os.path.join(dir_b, name)))
+        if arr_a.shape != arr_b.shape or not np.array_equal(arr_a, arr_b):
+            return False
+    return True
+
+def main():
+    args = get_args()
+    rng = np.random.default_rng(args.seed)
+    noise = rng.integers(200, 256, (args.height, args.width, 3), dtype=np.uint8)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        base_img_path = os.path.join(tmp, "texture_base.png")
+        Image.fromarray(noise).save(base_img_path)
+
+        print(f"Render size: {args.width}x{args.height} | repeats: {args.repeats}")
+        print("\n--- Mask engine only ---")
+        print("{:<8} | {:^12} | {:^12} | {:^8} | {:^10}".format("Pieces", "Legacy(s)", "Labelled(s)", "Speedup", "Identical"))
+        print("-" * 62)
+        for n in args.piece_counts:
+            t_legacy, legacy_pieces = timed_engine(legacy_iter_cut_pieces, args.width, args.height, n, args.seed, args.repeats)
+            t_new, new_pieces = timed_engine(iter_cut_pieces, args.width, args.height, n, args.seed, args.repeats)
+            same = pieces_identical(legacy_pieces, new_pieces)
+            print("{:<8} | {:^12.3f} | {:^12.3f} | {:^8.2f} | {:^10}".format(n, t_legacy, t_new, t_legacy / t_new, str(same)))
+
+        print("\n--- End-to-end (incl. PNG writes) ---")
+        print("{:<8} | {:^12} | {:^12} | {:^8} | {:^10}".format("Pieces", "Legacy(s)", "Labelled(s)", "Speedup", "Identical"))
+        print("-" * 62)
+        for n in args.piece_counts:
+            legacy_dir = os.path.join(tmp, f"legacy_{n}")
+            new_dir = os.path.join(tmp, f"labelled_{n}")
+            t_legacy = timed_run(legacy_generate_cut_masks, base_img_path, legacy_dir, n, args.seed, args.repeats)
+            t_new = timed_run(generate_cut_masks, base_img_path, new_dir, n, args.seed, args.repeats)
+            same = outputs_identical(legacy_dir, new_dir)
+            print("{:<8} | {:^12.3f} | {:^12.3f} | {:^8.2f} | {:^10}".format(n, t_legacy, t_new, t_legacy / t_new, str(same)))
+
+if __name__ == "__main__":
+    main()
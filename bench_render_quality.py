@@ -0,0 +1,130 @@
+import os
+import json
+import random
+import argparse
+import statistics
+import subprocess
+import numpy as np
+from PIL import Image
+from scipy import ndimage
+
+import packing
+
+BLENDER_BINARY = "./blender/blender"
+BLENDER_SCRIPT = "blenderprocess_.py"
+REFERENCE_TIER = "archival"
+
+def get_args():
+    parser = argparse.ArgumentParser(description="Benchmark render quality tiers: seconds/render and similarity to the archival tier")
+    parser.add_argument('--blender', type=str, default=BLENDER_BINARY, help='Path to the Blender executable')
+    parser.add_argument('--source_root', type=str, default=packing.SOURCE_ROOT_DIR, help='Root directory of group_N_pieces/<doc> folders')
+    parser.add_argument('--tiers', nargs='+', default=['draft', 'eval', REFERENCE_TIER], help='Quality tiers to compare')
+    parser.add_argument('--limit', type=int, default=8, help='Number of documents to sample')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for document sampling and layouts')
+    parser.add_argument('--compare_size', type=int, default=1024, help='Images are compared at this resolution')
+    parser.add_argument('--output_root', type=str, default='bench_renders', help='Where per-tier renders and timings are written')
+    # 其余参数转发给 blenderprocess_.py，例如 --mesh_builder light --crumple shader
+    return parser.parse_known_args()
+
+def ssim(a, b, sigma=1.5):
+    # 单通道 SSIM（Gaussian 窗口，常数取 Wang et al. 2004 的默认值）
+    c1, c2 = (0.01 * 255) ** 2, (0.03 * 255) ** 2
+    mu_a = ndimage.gaussian_filter(a, sigma)
+    mu_b = ndimage.gaussian_filter(b, sigma)
+    var_a = ndimage.gaussian_filter(a * a, sigma) - mu_a ** 2
+    var_b = ndimage.gaussian_filter(b * b, sigma) - mu_b ** 2
+    cov = ndimage.gaussian_filter(a * b, sigma) - mu_a * mu_b
+    num = (2 * mu_a * mu_b + c1) * (2 * cov + c2)
+    den = (mu_a ** 2 + mu_b ** 2 + c1) * (var_a + var_b + c2)
+    return float(np.mean(num / den))
+
+def psnr(a, b):
+    mse = float(np.mean((a - b) ** 2))
+    return float('inf') if mse == 0 else 10 * np.log10(255.0 ** 2 / mse)
+
+def load_gray(path, size):
+    with Image.open(path) as img:
+        return np.asarray(img.convert('L').resize((size, size), Image.Resampling.LANCZOS), dtype=np.float64)
+
+def read_timings(path):
+    timings = {}
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                record = json.loads(line)
+                timings[record['name']] = record
+    return timings
+
+def main():
+    args, blender_args = get_args()
+    # 命令里已经带了 "--"，用户多写的一个不能再转发给 blenderprocess_.py
+    if blender_args[:1] == ["--"]:
+        blender_args = blender_args[1:]
+    docs = packing.find_document_folders(args.source_root)
+    random.Random(args.seed).shuffle(docs)
+    docs = sorted(docs[:args.limit], key=lambda x: x[1])
+    if not docs:
+        print(f"No documents found under {args.source_root}")
+        return
+
+    # 所有档位必须共用同一份布局，否则比较的是不同的场景
+    for folder_path, name in docs:
+        if packing.load_layout(folder_path) is None:
+            packing.save_layout(folder_path, packing.compute_layout(folder_path, packing.document_rng(name, args.seed)))
+
+    os.makedirs(args.output_root, exist_ok=True)
+    task_file = os.path.join(args.output_root, "tasks.json")
+    with open(task_file, 'w', encoding='utf-8') as f:
+        json.dump(docs, f)
+
+    timings = {}
+    for tier in args.tiers:
+        tier_dir = os.path.join(args.output_root, tier)
+        timing_log = os.path.join(tier_dir, "timing.jsonl")
+        os.makedirs(tier_dir, exist_ok=True)
+        print(f"Rendering {len(docs)} documents at tier '{tier}'...")
+        cmd = [args.blender, "-b", "-P", BLENDER_SCRIPT, "--",
+               "--task_file", task_file, "--output_dir", tier_dir,
+               "--quality", tier, "--timing_log", timing_log] + blender_args
+        subprocess.run(cmd, check=False, stdout=subprocess.DEVNULL)
+        timings[tier] = read_timings(timing_log)
+
+    reference = timings.get(REFERENCE_TIER, {})
+    lines = []
+    lines.append("=" * 72)
+    lines.append("                    Render Quality Tier Benchmark                    ")
+    lines.append("=" * 72)
+    lines.append(f"Documents: {len(docs)} | Reference tier: {REFERENCE_TIER} | Compared at {args.compare_size}px\n")
+    header_fmt = "{:<10} | {:^10} | {:^10} | {:^10} | {:^10} | {:^6}"
+    row_fmt = "{:<10} | {:^10.2f} | {:^10.4f} | {:^10.4f} | {:^10.2f} | {:^6}"
+    lines.append(header_fmt.format("Tier", "s/render", "SSIM(↑)", "minSSIM", "PSNR(dB)", "Count"))
+    lines.append("-" * 72)
+    for tier in args.tiers:
+        records = timings.get(tier, {})
+        if not records:
+            lines.append(header_fmt.format(tier, "N/A", "N/A", "N/A", "N/A", 0))
+            continue
+        secs = statistics.mean(r['seconds'] for r in records.values())
+        ssims, psnrs = [], []
+        for name, record in records.items():
+            if name not in reference:
+                continue
+            a = load_gray(record['output'], args.compare_size)
+            b = load_gray(reference[name]['output'], args.compare_size)
+            ssims.append(ssim(a, b))
+            psnrs.append(psnr(a, b))
+        if ssims:
+            finite_psnrs = [p for p in psnrs if p != float('inf')]
+            mean_psnr = statistics.mean(finite_psnrs) if finite_psnrs else float('inf')
+            lines.append(row_fmt.format(tier, secs, statistics.mean(ssims), min(ssims), mean_psnr, len(records)))
+        else:
+            lines.append(header_fmt.format(tier, f"{secs:.2f}", "N/A", "N/A", "N/A", len(records)))
+
+    report_path = os.path.join(args.output_root, "report.txt")
+    with open(report_path, 'w', encoding='utf-8') as f:
+        f.write("\n".join(lines))
+    print("\n".join(lines))
+    print(f"\nReport saved to: {os.path.abspath(report_path)}")
+
+if __name__ == "__main__":
+    main()
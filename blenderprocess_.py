@@ -3,28 +3,96 @@ import os
 import random
 import math
 import sys
+import json
+import time
+import argparse
+import contextlib
 import numpy as np
 
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 try:
     from PIL import Image, ImageOps
 except ImportError:
     print("❌ 错误: 需要 PIL 库。请在 Blender Python 环境中运行: pip install pillow")
+try:
+    import packing
+    import fragment_store
+    from packing import PIXELS_PER_METER
+except ImportError as e:
+    print(f"❌ 错误: 无法加载 packing 模块 ({e})。请在 Blender Python 环境中运行: pip install pillow scipy")
 SOURCE_ROOT_DIR = os.path.abspath("news_textures_output")
 RENDER_OUTPUT_DIR = os.path.abspath("final_renders")
-RESOLUTION = (4096, 4096) 
-NUM_SAMPLES = 128  
-PIXELS_PER_METER = 500.0
+# 质量档位：分辨率、采样、反弹上限、自适应采样阈值与 OIDN 降噪一起切换
+RENDER_PRESETS = {
+    'draft': {
+        'resolution': (1024, 1024), 'samples': 16, 'adaptive_threshold': 0.1, 'denoise': True, 'time_limit': 15,
+        'max_bounces': 4, 'diffuse_bounces': 2, 'glossy_bounces': 2, 'transparent_max_bounces': 16,
+    },
+    'eval': {
+        'resolution': (2048, 2048), 'samples': 48, 'adaptive_threshold': 0.03, 'denoise': True, 'time_limit': 60,
+        'max_bounces': 8, 'diffuse_bounces': 4, 'glossy_bounces': 4, 'transparent_max_bounces': 32,
+    },
+    # archival 是默认档位，也是 bench_render_quality.py 的对照基准：不设时限，保证渲染结果固定
+    'archival': {
+        'resolution': (4096, 4096), 'samples': 128, 'adaptive_threshold': 0.01, 'denoise': False, 'time_limit': 0,
+        'max_bounces': 32, 'diffuse_bounces': 8, 'glossy_bounces': 8, 'transparent_max_bounces': 128,
+    },
+}
+DEFAULT_QUALITY = 'archival'
+OUTPUT_EXTENSIONS = {'PNG': '.png', 'JPEG': '.jpg', 'WEBP': '.webp'}
+DEFAULT_OUTPUT_QUALITY = 95
 LIGHT_ENERGY = 15000 
 CRUMPLE_STRENGTH_LARGE = 0.15 
 CRUMPLE_STRENGTH_SMALL = 0.02 
 PAPER_THICKNESS = 0.002
-PACKING_DOWNSAMPLE = 0.1
-PACKING_PADDING = 30
-CANVAS_GROWTH = 500
+LIGHT_MESH_SEGMENTS_PER_METER = 48
+LIGHT_MESH_MIN_SEGMENTS = 8
+LIGHT_MESH_MAX_SEGMENTS = 96
+BUMP_STRENGTH_LARGE = 0.6
+BUMP_STRENGTH_SMALL = 0.3
+
+CRUMPLE_SEED_RANGE = 50.0
 
 if not os.path.exists(RENDER_OUTPUT_DIR):
     os.makedirs(RENDER_OUTPUT_DIR)
 
+def get_args():
+    # Blender 会吞掉自己的参数，脚本参数放在 "--" 之后
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    parser = argparse.ArgumentParser(description="Render shredded document scenes with Cycles")
+    parser.add_argument('--quality', choices=sorted(RENDER_PRESETS), default=DEFAULT_QUALITY, help='Render quality tier')
+    parser.add_argument('--time_budget', type=float, default=None, help='Per-document render time limit in seconds (default: the tier\'s time_limit; 0 = unlimited)')
+    parser.add_argument('--timing_log', type=str, default=None, help='Append per-document render timings (JSON lines) to this file')
+    parser.add_argument('--mesh_builder', choices=['subdivide', 'light'], default='subdivide', help='subdivide: bpy.ops plane + subdivide(40) + Subsurf(2); light: size-adaptive grid built directly from NumPy')
+    parser.add_argument('--crumple', choices=['geometry', 'shader'], default='geometry', help='Crumple as Displace modifiers (geometry) or as a bump in the material (shader)')
+    parser.add_argument('--persistent_scene', action='store_true', help='Keep camera, light, ground and piece templates alive across documents')
+    parser.add_argument('--output_format', choices=sorted(OUTPUT_EXTENSIONS), default='PNG', help='File format written by Blender for each render')
+    parser.add_argument('--output_quality', type=int, default=DEFAULT_OUTPUT_QUALITY, help='JPEG/WebP quality (0-100)')
+    parser.add_argument('--output_size', type=int, default=None, help='Cap the longer side of the output at this many pixels')
+    parser.add_argument('--keep_master', action='store_true', help='Also keep a full-resolution lossless PNG next to a JPEG/WebP output')
+    parser.add_argument('--source_root', type=str, default=SOURCE_ROOT_DIR, help='Root directory of group_N_pieces/<doc> folders')
+    parser.add_argument('--output_dir', type=str, default=RENDER_OUTPUT_DIR, help='Directory for final renders')
+    parser.add_argument('--task_file', type=str, default=None, help='JSON task list written by render_driver.py (skips the directory walk)')
+    parser.add_argument('--shard_index', type=int, default=0, help='Index of this worker when sharding statically')
+    parser.add_argument('--num_shards', type=int, default=1, help='Total number of static shards')
+    parser.add_argument('--claim_dir', type=str, default=None, help='Claim documents through lock files in this directory (work-queue mode)')
+    return parser.parse_args(argv)
+
+def claim_task(claim_dir, name):
+    # O_CREAT | O_EXCL 在同一文件系统上是原子的：只有一个进程能认领成功
+    claim_path = os.path.join(claim_dir, name.replace("/", "__") + ".claim")
+    try:
+        fd = os.open(claim_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        return False
+    with os.fdopen(fd, 'w') as f:
+        f.write(str(os.getpid()))
+    return True
+
+def release_task(claim_dir, name):
+    try: os.remove(os.path.join(claim_dir, name.replace("/", "__") + ".claim"))
+    except OSError: pass
+
 def reset_scene():
     bpy.ops.object.select_all(action='SELECT')
     bpy.ops.object.delete()
@@ -39,20 +107,34 @@ def reset_scene():
     for _ in range(3):
         bpy.ops.outliner.orphans_purge()
 
-def setup_render_settings():
+def fit_resolution(resolution, max_size=None):
+    width, height = resolution
+    if max_size and max(width, height) > max_size:
+        ratio = max_size / max(width, height)
+        return int(width * ratio), int(height * ratio)
+    return width, height
+
+def setup_render_settings(quality=DEFAULT_QUALITY, max_size=None, time_budget=None):
+    preset = RENDER_PRESETS[quality]
     scene = bpy.context.scene
     scene.render.engine = 'CYCLES'
-    scene.cycles.use_denoising = False 
-    scene.cycles.samples = NUM_SAMPLES
+    # 每个文档只渲染一帧：到时限后 Cycles 停止采样并输出当前结果（降噪照常进行）
+    scene.cycles.time_limit = preset['time_limit'] if time_budget is None else time_budget
+    scene.cycles.use_denoising = preset['denoise']
+    if preset['denoise']:
+        scene.cycles.denoiser = 'OPENIMAGEDENOISE'
+    scene.cycles.samples = preset['samples']
     scene.cycles.use_adaptive_sampling = True 
-    scene.render.resolution_x = RESOLUTION[0]
-    scene.render.resolution_y = RESOLUTION[1]
+    scene.cycles.adaptive_threshold = preset['adaptive_threshold']
+    # 没有无损母版时直接按输出尺寸渲染，不必先渲染大图再缩小
+    scene.render.resolution_x, scene.render.resolution_y = fit_resolution(preset['resolution'], max_size)
+    scene.render.resolution_percentage = 100
     scene.render.filter_size = 0.8 
     
-    scene.cycles.max_bounces = 32
-    scene.cycles.diffuse_bounces = 8
-    scene.cycles.glossy_bounces = 8
-    scene.cycles.transparent_max_bounces = 128
+    scene.cycles.max_bounces = preset['max_bounces']
+    scene.cycles.diffuse_bounces = preset['diffuse_bounces']
+    scene.cycles.glossy_bounces = preset['glossy_bounces']
+    scene.cycles.transparent_max_bounces = preset['transparent_max_bounces']
     preferences = bpy.context.preferences
     try:
         cycles_prefs = preferences.addons['cycles'].preferences
@@ -64,34 +146,25 @@ def setup_render_settings():
         print("未检测到 GPU 或设置失败，使用 CPU")
         scene.cycles.device = 'CPU'
 
-def create_piece_object(mask_path, tex_path, idx, location, rotation_z):
+def load_piece_images(mask_path, tex_path):
     try:
         tex_image = bpy.data.images.load(tex_path)
         mask_image = bpy.data.images.load(mask_path)
     except:
-        return None
+        return None, None
     mask_image.colorspace_settings.name = 'Non-Color'
+    return tex_image, mask_image
 
-    px_w, px_h = tex_image.size
-    real_w = px_w / PIXELS_PER_METER
-    real_h = px_h / PIXELS_PER_METER
-
-    bpy.ops.mesh.primitive_plane_add(size=1.0, location=location)
-    obj = bpy.context.object
-    obj.name = f"Piece_{idx}"
-    obj.scale = (real_w, real_h, 1.0)
-    obj.rotation_euler = (0, 0, rotation_z)
-    
-    bpy.ops.object.transform_apply(location=False, rotation=True, scale=True)
-    bpy.ops.object.mode_set(mode='EDIT')
-    bpy.ops.mesh.subdivide(number_cuts=40) 
-    bpy.ops.object.mode_set(mode='OBJECT')
+def add_paper_modifiers(obj, idx, subsurf=True, displace=True):
     mod_solid = obj.modifiers.new(name="Thickness", type='SOLIDIFY')
     mod_solid.thickness = PAPER_THICKNESS
     
-    mod_sub = obj.modifiers.new(name="Subsurf", type='SUBSURF')
-    mod_sub.levels = 2
-    mod_sub.render_levels = 2
+    if subsurf:
+        mod_sub = obj.modifiers.new(name="Subsurf", type='SUBSURF')
+        mod_sub.levels = 2
+        mod_sub.render_levels = 2
+    if not displace:
+        return []
 
     mod_wave = obj.modifiers.new(name="LargeWave", type='DISPLACE')
     tex_wave = bpy.data.textures.new(f"Tex_Wave_{idx}", type='MARBLE')
@@ -104,8 +177,37 @@ def create_piece_object(mask_path, tex_path, idx, location, rotation_z):
     tex_crumple.noise_scale = 8.0
     mod_crumple.texture = tex_crumple
     mod_crumple.strength = CRUMPLE_STRENGTH_SMALL
-    
-    bpy.ops.object.shade_smooth()
+    return [mod_wave, mod_crumple]
+
+def add_bump_crumple(nodes, links, bsdf):
+    # 纹理空间的褶皱：两层噪声分别驱动 Bump，只改法线不增加几何
+    coord = nodes.new('ShaderNodeTexCoord')
+    noise_large = nodes.new('ShaderNodeTexNoise')
+    noise_large.inputs['Scale'].default_value = 1.5
+    noise_small = nodes.new('ShaderNodeTexNoise')
+    noise_small.inputs['Scale'].default_value = 8.0
+    noise_small.inputs['Detail'].default_value = 8.0
+    bump_large = nodes.new('ShaderNodeBump')
+    bump_large.inputs['Strength'].default_value = BUMP_STRENGTH_LARGE
+    bump_large.inputs['Distance'].default_value = CRUMPLE_STRENGTH_LARGE
+    bump_small = nodes.new('ShaderNodeBump')
+    bump_small.inputs['Strength'].default_value = BUMP_STRENGTH_SMALL
+    bump_small.inputs['Distance'].default_value = CRUMPLE_STRENGTH_SMALL
+
+    links.new(coord.outputs['Object'], noise_large.inputs['Vector'])
+    links.new(coord.outputs['Object'], noise_small.inputs['Vector'])
+    links.new(noise_large.outputs['Fac'], bump_large.inputs['Height'])
+    links.new(noise_small.outputs['Fac'], bump_small.inputs['Height'])
+    links.new(bump_large.outputs['Normal'], bump_small.inputs['Normal'])
+    links.new(bump_small.outputs['Normal'], bsdf.inputs['Normal'])
+
+def link_mask_source(node_tree, from_alpha):
+    # 图集把遮罩放在 alpha 通道里，单独的 mask 图则用颜色通道
+    nodes = node_tree.nodes
+    source = nodes["PieceTex"].outputs['Alpha'] if from_alpha else nodes["PieceMask"].outputs['Color']
+    node_tree.links.new(source, nodes["PieceMaskThreshold"].inputs[0])
+
+def create_piece_material(idx, tex_image, mask_image, crumple='geometry', mask_from_alpha=False):
     mat = bpy.data.materials.new(name=f"Mat_{idx}")
     mat.use_nodes = True
     nodes = mat.node_tree.nodes
@@ -115,15 +217,18 @@ def create_piece_object(mask_path, tex_path, idx, location, rotation_z):
     output = nodes.new('ShaderNodeOutputMaterial')
     bsdf = nodes.new('ShaderNodeBsdfPrincipled')
     tex_node = nodes.new('ShaderNodeTexImage')
+    tex_node.name = "PieceTex"
     tex_node.image = tex_image
     tex_node.interpolation = 'Linear' 
     mask_node = nodes.new('ShaderNodeTexImage')
+    mask_node.name = "PieceMask"
     mask_node.image = mask_image
     mask_node.interpolation = 'Linear' 
     mix_color_node = nodes.new('ShaderNodeMixRGB')
     mix_color_node.blend_type = 'MULTIPLY'
     mix_color_node.inputs[0].default_value = 1.0 # Fac
     math_node = nodes.new('ShaderNodeMath')
+    math_node.name = "PieceMaskThreshold"
     math_node.operation = 'GREATER_THAN'
     math_node.inputs[1].default_value = 0.90 
     
@@ -139,127 +244,192 @@ def create_piece_object(mask_path, tex_path, idx, location, rotation_z):
     trans_bsdf = nodes.new('ShaderNodeBsdfTransparent')
 
     links.new(tex_node.outputs['Color'], bsdf.inputs['Base Color'])
-    links.new(mask_node.outputs['Color'], math_node.inputs[0])
+    link_mask_source(mat.node_tree, mask_from_alpha)
     links.new(math_node.outputs['Value'], mix_shader.inputs['Fac'])
     links.new(trans_bsdf.outputs['BSDF'], mix_shader.inputs[1])
     links.new(bsdf.outputs['BSDF'], mix_shader.inputs[2])
     links.new(mix_shader.outputs['Shader'], output.inputs['Surface'])
     bsdf.inputs['Roughness'].default_value = 1.0 
     bsdf.inputs['Specular IOR Level'].default_value = 0.0 
+    if crumple == 'shader':
+        add_bump_crumple(nodes, links, bsdf)
     
     mat.blend_method = 'CLIP'
-    obj.data.materials.append(mat)
+    return mat
 
-    return obj
+def grid_segments(real_size):
+    return int(min(LIGHT_MESH_MAX_SEGMENTS, max(LIGHT_MESH_MIN_SEGMENTS, math.ceil(real_size * LIGHT_MESH_SEGMENTS_PER_METER))))
 
+def build_grid_mesh(name, real_w, real_h, rotation_z):
+    """
+    Build a UV-mapped grid mesh directly from NumPy arrays, already scaled and
+    rotated like the transform_apply in create_piece_object. Resolution
+    follows the piece size instead of a fixed 40 cuts + Subsurf(2).
+    """
+    nx, ny = grid_segments(real_w), grid_segments(real_h)
+    gx, gy = np.meshgrid(np.linspace(-0.5, 0.5, nx + 1), np.linspace(-0.5, 0.5, ny + 1))
+    cos_r, sin_r = math.cos(rotation_z), math.sin(rotation_z)
+    x, y = gx * real_w, gy * real_h
+    verts = np.column_stack([(x * cos_r - y * sin_r).ravel(), (x * sin_r + y * cos_r).ravel(), np.zeros(gx.size)])
+    idx = np.arange(gx.size).reshape(ny + 1, nx + 1)
+    faces = np.stack([idx[:-1, :-1], idx[:-1, 1:], idx[1:, 1:], idx[1:, :-1]], axis=-1).reshape(-1, 4)
 
-def load_and_process_mask_for_packing(mask_path, downsample_factor, padding_px):
-    img = Image.open(mask_path).convert('L')
-    angle = random.uniform(0, 360)
-    img_rot = img.rotate(angle, expand=True, resample=Image.BICUBIC)
-    w, h = img_rot.size
-    new_w = int(w * downsample_factor)
-    new_h = int(h * downsample_factor)
-    img_small = img_rot.resize((new_w, new_h), Image.NEAREST)
-    arr = np.array(img_small) > 128
-
-    pad_r = int(padding_px * downsample_factor)
-    if pad_r > 0:
-        arr_padded = arr.copy()
-        for dx in range(-pad_r, pad_r+1):
-            for dy in range(-pad_r, pad_r+1):
-                if dx==0 and dy==0: continue
-                shifted = np.roll(arr, shift=(dy, dx), axis=(0, 1))
-                arr_padded |= shifted
-    else:
-        arr_padded = arr
-    return arr_padded, angle, (w, h)
-
-def pixel_perfect_layout(folder_path, masks):
-    pieces_data = []
-    total_mask_area = 0
-    for i, mask_file in enumerate(masks):
-        try:
-            idx = int(mask_file.split("_")[1].split(".")[0])
-        except: continue
-        mask_path = os.path.join(folder_path, mask_file)
-        mask_arr_padded, angle_deg, rot_size_px = load_and_process_mask_for_packing(
-            mask_path, PACKING_DOWNSAMPLE, PACKING_PADDING
+    mesh = bpy.data.meshes.new(name)
+    mesh.from_pydata(verts.tolist(), [], faces.tolist())
+    uv_layer = mesh.uv_layers.new(name="UVMap")
+    loop_verts = np.empty(len(mesh.loops), dtype=np.int32)
+    mesh.loops.foreach_get('vertex_index', loop_verts)
+    uvs = np.column_stack([(gx + 0.5).ravel(), (gy + 0.5).ravel()])[loop_verts]
+    uv_layer.data.foreach_set('uv', uvs.astype(np.float32).ravel())
+    mesh.polygons.foreach_set('use_smooth', np.ones(len(mesh.polygons), dtype=bool))
+    mesh.update()
+    return mesh
+
+def remap_uvs(mesh, uv_rect, base_uv=None):
+    """Map the unit UV square (or `base_uv`) into uv_rect = (u0, v0, su, sv)."""
+    uv_data = mesh.uv_layers.active.data
+    if base_uv is None:
+        base_uv = np.empty(len(uv_data) * 2, dtype=np.float32)
+        uv_data.foreach_get('uv', base_uv)
+    u0, v0, su, sv = uv_rect
+    uv = base_uv.reshape(-1, 2) * np.array([su, sv], dtype=np.float32) + np.array([u0, v0], dtype=np.float32)
+    uv_data.foreach_set('uv', uv.ravel())
+    mesh.update()
+
+def atlas_uv_rect(rect, atlas_size):
+    # atlas.json 的矩形以左上角为原点，Blender 的 UV 原点在左下角
+    x, y, w, h = rect
+    atlas_w, atlas_h = atlas_size
+    return (x / atlas_w, (atlas_h - y - h) / atlas_h, w / atlas_w, h / atlas_h)
+
+def load_atlas_image(folder_path):
+    index = fragment_store.load_atlas_index(folder_path)
+    if index is None:
+        return None, None
+    try:
+        atlas_image = bpy.data.images.load(os.path.join(folder_path, fragment_store.ATLAS_IMAGE))
+    except:
+        return None, None
+    # 颜色与 alpha 各自独立，不能按预乘处理
+    atlas_image.alpha_mode = 'CHANNEL_PACKED'
+    return atlas_image, {entry['idx']: entry['rect'] for entry in index['pieces']}
+
+def image_from_arrays(name, tex, mask):
+    # 直接从内存映射的 uint8 数据构建 RGBA 图像，不经过 PNG 解码
+    h, w = mask.shape
+    image = bpy.data.images.new(name, width=w, height=h, alpha=True)
+    rgba = np.empty((h, w, 4), dtype=np.float32)
+    rgba[..., :3] = tex
+    rgba[..., 3] = mask
+    rgba *= 1.0 / 255.0
+    # Blender 的像素行从下往上存
+    image.pixels.foreach_set(rgba[::-1].ravel())
+    image.alpha_mode = 'CHANNEL_PACKED'
+    return image
+
+def load_document_pieces(folder_path, layout):
+    """
+    Resolve every layout entry to (tex_image, mask_image, (px_w, px_h), uv_rect),
+    or None if it cannot be loaded. Sources are tried in order: fragment store
+    (one RGBA image per piece, built from memory-mapped bytes), atlas (one
+    image for all pieces, uv_rect selects the piece), then PNG pairs. mask_image
+    is None whenever the mask lives in the alpha channel.
+    """
+    fragments = fragment_store.open_fragments(folder_path)
+    if fragments is not None:
+        pieces = []
+        for entry in layout:
+            fragment = fragments.get(entry['idx'])
+            if fragment is None:
+                pieces.append(None)
+                continue
+            mask, tex, _ = fragment
+            pieces.append((image_from_arrays(f"Piece_{entry['idx']}", tex, mask), None, (mask.shape[1], mask.shape[0]), None))
+        return pieces
+
+    atlas_image, rects = load_atlas_image(folder_path)
+    pieces = []
+    for entry in layout:
+        if atlas_image is not None:
+            rect = rects.get(entry['idx'])
+            pieces.append(None if rect is None else (atlas_image, None, (rect[2], rect[3]), atlas_uv_rect(rect, atlas_image.size)))
+            continue
+        tex_image, mask_image = load_piece_images(
+            os.path.join(folder_path, entry['mask_file']), os.path.join(folder_path, entry['tex_file'])
         )
-        area = np.sum(mask_arr_padded)
-        total_mask_area += area
-        pieces_data.append({
-            'idx': idx, 'mask_file': mask_file, 'mask_arr': mask_arr_padded,
-            'angle': math.radians(angle_deg), 'area': area, 'rot_size_px': rot_size_px
-        })
-    pieces_data.sort(key=lambda x: x['area'], reverse=True)
-    estimated_side = int(math.sqrt(total_mask_area / 0.5)) 
-    canvas_side = int(estimated_side * 1.5)
-    max_piece_dim = max([max(p['mask_arr'].shape) for p in pieces_data])
-    canvas_side = max(canvas_side, max_piece_dim * 2)
-    canvas = np.zeros((canvas_side, canvas_side), dtype=bool)
-    placed_objects = []
-    center_y, center_x = canvas_side // 2, canvas_side // 2
+        pieces.append(None if tex_image is None else (tex_image, mask_image, tuple(tex_image.size), None))
+    return pieces
+
+def create_light_piece_object(tex_image, mask_image, px_size, uv_rect, idx, location, rotation_z, crumple='geometry'):
+    px_w, px_h = px_size
+    mesh = build_grid_mesh(f"Piece_{idx}", px_w / PIXELS_PER_METER, px_h / PIXELS_PER_METER, rotation_z)
+    if uv_rect is not None:
+        remap_uvs(mesh, uv_rect)
+    obj = bpy.data.objects.new(f"Piece_{idx}", mesh)
+    bpy.context.scene.collection.objects.link(obj)
+    obj.location = location
+    add_paper_modifiers(obj, idx, subsurf=False, displace=(crumple == 'geometry'))
+    mesh.materials.append(create_piece_material(idx, tex_image, mask_image, crumple, mask_image is None))
+    return obj
+
+def create_piece_object(tex_image, mask_image, px_size, uv_rect, idx, location, rotation_z, mesh_builder='subdivide', crumple='geometry'):
+    if mesh_builder == 'light':
+        return create_light_piece_object(tex_image, mask_image, px_size, uv_rect, idx, location, rotation_z, crumple)
+
+    px_w, px_h = px_size
+    real_w = px_w / PIXELS_PER_METER
+    real_h = px_h / PIXELS_PER_METER
+
+    bpy.ops.mesh.primitive_plane_add(size=1.0, location=location)
+    obj = bpy.context.object
+    obj.name = f"Piece_{idx}"
+    obj.scale = (real_w, real_h, 1.0)
+    obj.rotation_euler = (0, 0, rotation_z)
     
-    step = 4 
-    scan_margin = int(estimated_side * 1.2) // 2
-    start_y = max(0, center_y - scan_margin)
-    end_y = min(canvas_side, center_y + scan_margin)
-    start_x = max(0, center_x - scan_margin)
-    end_x = min(canvas_side, center_x + scan_margin)
-
-    for p in pieces_data:
-        mask_arr = p['mask_arr']
-        p_h, p_w = mask_arr.shape
-        placed = False
-        best_x, best_y = -1, -1
-        min_dist_sq = float('inf')
-        
-        for y in range(start_y, end_y, step):
-            for x in range(start_x, end_x, step):
-                if y+p_h > canvas_side or x+p_w > canvas_side: continue
-                curr_cy = y + p_h/2
-                curr_cx = x + p_w/2
-                dist_sq = (curr_cy - center_y)**2 + (curr_cx - center_x)**2
-                region = canvas[y:y+p_h, x:x+p_w]
-                if np.any(region & mask_arr): continue 
-
-                if dist_sq < min_dist_sq:
-                    min_dist_sq = dist_sq
-                    best_x, best_y = x, y
-                    placed = True
-                    if dist_sq < 100: break 
-            if placed and min_dist_sq < 100: break
-
-        if not placed:
-            for y in range(0, canvas_side - p_h, step*2):
-                if placed: break
-                for x in range(0, canvas_side - p_w, step*2):
-                    region = canvas[y:y+p_h, x:x+p_w]
-                    if not np.any(region & mask_arr):
-                        best_x, best_y = x, y
-                        placed = True
-                        break
-        
-        if placed:
-            canvas[best_y:best_y+p_h, best_x:best_x+p_w] |= mask_arr
-            orig_x_px = best_x / PACKING_DOWNSAMPLE
-            orig_y_px = best_y / PACKING_DOWNSAMPLE
-            rot_w_px, rot_h_px = p['rot_size_px']
-            world_left = orig_x_px / PIXELS_PER_METER
-            world_top = -orig_y_px / PIXELS_PER_METER 
-            center_obj_x = world_left + (rot_w_px / PIXELS_PER_METER) / 2.0
-            center_obj_y = world_top - (rot_h_px / PIXELS_PER_METER) / 2.0
-            center_obj_z = random.uniform(0.01, 0.05)
-            
-            tex_path = os.path.join(folder_path, f"tex_{p['idx']}.png")
-            mask_path = os.path.join(folder_path, p['mask_file'])
-            obj = create_piece_object(mask_path, tex_path, p['idx'], (center_obj_x, center_obj_y, center_obj_z), p['angle'])
-            if obj: placed_objects.append(obj)
+    bpy.ops.object.transform_apply(location=False, rotation=True, scale=True)
+    bpy.ops.object.mode_set(mode='EDIT')
+    bpy.ops.mesh.subdivide(number_cuts=40) 
+    bpy.ops.object.mode_set(mode='OBJECT')
+    if uv_rect is not None:
+        remap_uvs(obj.data, uv_rect)
+    add_paper_modifiers(obj, idx, displace=(crumple == 'geometry'))
+    
+    bpy.ops.object.shade_smooth()
+    obj.data.materials.append(create_piece_material(idx, tex_image, mask_image, crumple, mask_image is None))
+
+    return obj
+
+def build_pieces_from_layout(folder_path, layout, mesh_builder='subdivide', crumple='geometry'):
+    placed_objects = []
+    for entry, piece in zip(layout, load_document_pieces(folder_path, layout)):
+        if piece is None: continue
+        tex_image, mask_image, px_size, uv_rect = piece
+        obj = create_piece_object(tex_image, mask_image, px_size, uv_rect, entry['idx'], tuple(entry['location']),
+                                  entry['rotation'], mesh_builder, crumple)
+        placed_objects.append(obj)
     return placed_objects
 
-def auto_fit_camera(objects):
-    if not objects: return
+def create_stage():
+    bpy.ops.object.camera_add(location=(0, 0, 20), rotation=(0, 0, 0))
+    cam = bpy.context.object
+    cam.data.type = 'ORTHO'
+    bpy.context.scene.camera = cam
+    bpy.ops.object.light_add(type='AREA', location=(0, 0, 15))
+    light = bpy.context.object
+    light.data.energy = LIGHT_ENERGY
+    
+    bpy.ops.mesh.primitive_plane_add(size=1.0, location=(0, 0, -0.1))
+    ground = bpy.context.object
+    mat_ground = bpy.data.materials.new(name="GroundMat")
+    mat_ground.use_nodes = True
+    bsdf = mat_ground.node_tree.nodes["Principled BSDF"]
+    bsdf.inputs['Base Color'].default_value = (0.05, 0.05, 0.05, 1) 
+    bsdf.inputs['Roughness'].default_value = 1.0 
+    ground.data.materials.append(mat_ground)
+    return cam, light, ground
+
+def fit_stage(stage, objects):
+    cam, light, ground = stage
     min_x, max_x = 9999.0, -9999.0
     min_y, max_y = 9999.0, -9999.0
     for obj in objects:
@@ -276,58 +446,270 @@ def auto_fit_camera(objects):
     margin_ratio = 1.05 
     ortho_scale = max(width, height) * margin_ratio
     
-    bpy.ops.object.camera_add(location=(center_x, center_y, 20), rotation=(0, 0, 0))
-    cam = bpy.context.object
-    cam.data.type = 'ORTHO'
+    cam.location = (center_x, center_y, 20)
     cam.data.ortho_scale = ortho_scale
-    bpy.context.scene.camera = cam
-    bpy.ops.object.light_add(type='AREA', location=(center_x, center_y, 15))
-    light = bpy.context.object
-    light.data.energy = LIGHT_ENERGY
+    light.location = (center_x, center_y, 15)
     light.data.size = ortho_scale * 1.5 
-    
-    bpy.ops.mesh.primitive_plane_add(size=ortho_scale * 3, location=(center_x, center_y, -0.1))
-    ground = bpy.context.object
-    mat_ground = bpy.data.materials.new(name="GroundMat")
-    mat_ground.use_nodes = True
-    bsdf = mat_ground.node_tree.nodes["Principled BSDF"]
-    bsdf.inputs['Base Color'].default_value = (0.05, 0.05, 0.05, 1) 
-    bsdf.inputs['Roughness'].default_value = 1.0 
-    ground.data.materials.append(mat_ground)
+    ground.location = (center_x, center_y, -0.1)
+    ground.scale = (ortho_scale * 3, ortho_scale * 3, 1.0)
 
-def process_single_folder(folder_path, folder_name):
+def auto_fit_camera(objects):
+    if not objects: return
+    fit_stage(create_stage(), objects)
+
+class PersistentScene:
+    """
+    Scene kept alive across documents. Camera, light, ground and a pool of
+    piece templates (mesh + modifier stack + material) are built once; each
+    document only swaps images, vertex positions (or, for the light builder,
+    the grid mesh), transforms and the crumple texture offset.
+    """
+    def __init__(self, quality=DEFAULT_QUALITY, mesh_builder='subdivide', crumple='geometry', render_size=None, time_budget=None):
+        reset_scene()
+        setup_render_settings(quality, render_size, time_budget)
+        self.mesh_builder = mesh_builder
+        self.crumple = crumple
+        self.stage = create_stage()
+        self.templates = []
+
+    def _new_template(self, slot):
+        light = self.mesh_builder == 'light'
+        if light:
+            obj = bpy.data.objects.new(f"PieceSlot_{slot}", build_grid_mesh(f"PieceSlot_{slot}", 1.0, 1.0, 0.0))
+            bpy.context.scene.collection.objects.link(obj)
+        else:
+            bpy.ops.mesh.primitive_plane_add(size=1.0, location=(0, 0, 0))
+            obj = bpy.context.object
+            obj.name = f"PieceSlot_{slot}"
+            bpy.ops.object.mode_set(mode='EDIT')
+            bpy.ops.mesh.subdivide(number_cuts=40) 
+            bpy.ops.object.mode_set(mode='OBJECT')
+            bpy.ops.object.shade_smooth()
+
+        # 置换纹理坐标挂到一个空物体上，移动它就等价于换一个随机种子
+        seed_empty = bpy.data.objects.new(f"CrumpleSeed_{slot}", None)
+        bpy.context.scene.collection.objects.link(seed_empty)
+        for mod in add_paper_modifiers(obj, slot, subsurf=not light, displace=(self.crumple == 'geometry')):
+            mod.texture_coords = 'OBJECT'
+            mod.texture_coords_object = seed_empty
+        material = create_piece_material(slot, None, None, self.crumple)
+        obj.data.materials.append(material)
+
+        base_co = np.empty(len(obj.data.vertices) * 3, dtype=np.float32)
+        obj.data.vertices.foreach_get('co', base_co)
+        base_uv = np.empty(len(obj.data.loops) * 2, dtype=np.float32)
+        obj.data.uv_layers.active.data.foreach_get('uv', base_uv)
+        return {'obj': obj, 'seed_empty': seed_empty, 'material': material,
+                'base_co': base_co.reshape(-1, 3), 'base_uv': base_uv}
+
+    def _hide(self, template):
+        template['obj'].hide_render = True
+        template['obj'].hide_viewport = True
+
+    def load_document(self, folder_path, layout):
+        while len(self.templates) < len(layout):
+            self.templates.append(self._new_template(len(self.templates)))
+
+        placed_objects = []
+        pieces = load_document_pieces(folder_path, layout)
+        # 图集被多个槽位共用，所有槽位换完之后才能判断旧图是否还有引用
+        stale_images = set(p[0] for p in pieces if p) | set(p[1] for p in pieces if p and p[1])
+        for template, entry, piece in zip(self.templates, layout, pieces):
+            obj = template['obj']
+            if piece is None:
+                self._hide(template)
+                continue
+            tex_image, mask_image, (px_w, px_h), uv_rect = piece
+
+            node_tree = template['material'].node_tree
+            nodes = node_tree.nodes
+            stale_images.update(image for image in (nodes["PieceTex"].image, nodes["PieceMask"].image) if image)
+            nodes["PieceTex"].image = tex_image
+            nodes["PieceMask"].image = mask_image
+            link_mask_source(node_tree, mask_image is None)
+
+            if self.mesh_builder == 'light':
+                # 网格分辨率随碎片尺寸变化，直接换一份新的网格数据
+                old_mesh = obj.data
+                obj.data = build_grid_mesh(obj.name, px_w / PIXELS_PER_METER, px_h / PIXELS_PER_METER, entry['rotation'])
+                if uv_rect is not None:
+                    remap_uvs(obj.data, uv_rect)
+                obj.data.materials.append(template['material'])
+                bpy.data.meshes.remove(old_mesh)
+            else:
+                # 等价于旧流程的 scale/rotation transform_apply，直接改写顶点坐标
+                cos_r, sin_r = math.cos(entry['rotation']), math.sin(entry['rotation'])
+                co = template['base_co'] * np.array([px_w / PIXELS_PER_METER, px_h / PIXELS_PER_METER, 1.0], dtype=np.float32)
+                co[:, 0], co[:, 1] = co[:, 0] * cos_r - co[:, 1] * sin_r, co[:, 0] * sin_r + co[:, 1] * cos_r
+                obj.data.vertices.foreach_set('co', co.ravel())
+                remap_uvs(obj.data, uv_rect or (0.0, 0.0, 1.0, 1.0), template['base_uv'])
+
+            obj.location = tuple(entry['location'])
+            template['seed_empty'].location = (
+                obj.location.x + random.uniform(-CRUMPLE_SEED_RANGE, CRUMPLE_SEED_RANGE),
+                obj.location.y + random.uniform(-CRUMPLE_SEED_RANGE, CRUMPLE_SEED_RANGE),
+                obj.location.z,
+            )
+            obj.hide_render = False
+            obj.hide_viewport = False
+            placed_objects.append(obj)
+
+        for template in self.templates[len(layout):]:
+            self._hide(template)
+        for image in stale_images:
+            if image.users == 0:
+                bpy.data.images.remove(image)
+        bpy.context.view_layer.update()
+        if placed_objects:
+            fit_stage(self.stage, placed_objects)
+        return placed_objects
+
+def configure_output(scene, file_format, quality=DEFAULT_OUTPUT_QUALITY):
+    settings = scene.render.image_settings
+    settings.file_format = file_format
+    if file_format == 'PNG':
+        settings.color_mode = 'RGBA'
+    else:
+        settings.color_mode = 'RGB'
+        settings.quality = quality
+
+@contextlib.contextmanager
+def atomic_output(filepath):
+    # 先写临时文件，成功后再改名，其他进程永远看不到半张图
+    tmp_filepath = f"{filepath}.{os.getpid()}.tmp"
+    try:
+        yield tmp_filepath
+        os.replace(tmp_filepath, filepath)
+    finally:
+        if os.path.exists(tmp_filepath):
+            os.remove(tmp_filepath)
+
+def save_downscaled(master_path, filepath, file_format, quality, max_size):
+    with Image.open(master_path) as img:
+        img = img.convert('RGB')
+        img = img.resize(fit_resolution(img.size, max_size), Image.Resampling.LANCZOS)
+        img.save(filepath, format=file_format, quality=quality)
+
+def output_path_for(output_dir, folder_name, output_format='PNG'):
+    return os.path.join(output_dir, f"{folder_name}{OUTPUT_EXTENSIONS[output_format]}")
+
+def process_single_folder(folder_path, folder_name, output_dir=RENDER_OUTPUT_DIR, persistent_scene=None, quality=DEFAULT_QUALITY,
+                          mesh_builder='subdivide', crumple='geometry', output_format='PNG',
+                          output_quality=DEFAULT_OUTPUT_QUALITY, output_size=None, keep_master=False, time_budget=None):
     print(f"处理: {folder_name}")
-    files = os.listdir(folder_path)
-    masks = sorted([f for f in files if f.startswith("mask_") and f.endswith(".png")])
-    if not masks: return
-    reset_scene()
-    setup_render_settings()
-    created_objects = pixel_perfect_layout(folder_path, masks)
+    # 优先读取 packing.py 预先生成的布局清单，没有时才在 Blender 内现算
+    layout = packing.load_layout(folder_path)
+    if layout is None:
+        layout = packing.compute_layout(folder_path)
+    if not layout:
+        print(f"⚠️ {folder_name} 没有可渲染的碎片，跳过")
+        return None
+    if persistent_scene is not None:
+        created_objects = persistent_scene.load_document(folder_path, layout)
+    else:
+        reset_scene()
+        setup_render_settings(quality, None if keep_master else output_size, time_budget)
+        created_objects = build_pieces_from_layout(folder_path, layout, mesh_builder, crumple)
+        if created_objects:
+            auto_fit_camera(created_objects)
     if created_objects:
-        auto_fit_camera(created_objects)
-        output_filepath = os.path.join(RENDER_OUTPUT_DIR, f"{folder_name}.png")
-        bpy.context.scene.render.filepath = output_filepath
-        bpy.ops.render.render(write_still=True)
-        print(f"✅ 已保存高清渲染: {output_filepath}")
+        output_filepath = output_path_for(output_dir, folder_name, output_format)
+        os.makedirs(os.path.dirname(output_filepath), exist_ok=True)
+        scene = bpy.context.scene
+        scene.render.use_file_extension = False
+        if keep_master and output_format != 'PNG':
+            # 母版保持全分辨率无损；压缩版从渲染结果直接写出，需要缩小时才回读母版
+            master_filepath = output_path_for(output_dir, folder_name, 'PNG')
+            configure_output(scene, 'PNG')
+            with atomic_output(master_filepath) as tmp_filepath:
+                scene.render.filepath = tmp_filepath
+                bpy.ops.render.render(write_still=True)
+            configure_output(scene, output_format, output_quality)
+            with atomic_output(output_filepath) as tmp_filepath:
+                resolution = (scene.render.resolution_x, scene.render.resolution_y)
+                if fit_resolution(resolution, output_size) != resolution:
+                    save_downscaled(master_filepath, tmp_filepath, output_format, output_quality, output_size)
+                else:
+                    bpy.data.images['Render Result'].save_render(tmp_filepath, scene=scene)
+            print(f"✅ 已保存母版: {master_filepath}")
+        else:
+            configure_output(scene, output_format, output_quality)
+            with atomic_output(output_filepath) as tmp_filepath:
+                scene.render.filepath = tmp_filepath
+                bpy.ops.render.render(write_still=True)
+        print(f"✅ 已保存渲染: {output_filepath}")
+        return output_filepath
+
+def load_tasks(args):
+    if args.task_file:
+        with open(args.task_file, 'r', encoding='utf-8') as f:
+            tasks = [tuple(t) for t in json.load(f)]
+    else:
+        tasks = packing.find_document_folders(args.source_root)
+    if args.num_shards > 1:
+        tasks = tasks[args.shard_index::args.num_shards]
+    return tasks
+
+def render_task(args, persistent_scene, path, name):
+    """
+    Render one document. Returns False only when rendering raised (the claim
+    is then released for the retry pass); a document with nothing to render
+    counts as done.
+    """
+    try:
+        start_t = time.time()
+        output_filepath = process_single_folder(path, name, args.output_dir, persistent_scene, args.quality,
+                                                args.mesh_builder, args.crumple, args.output_format,
+                                                args.output_quality, args.output_size, args.keep_master, args.time_budget)
+        if args.timing_log and output_filepath:
+            with open(args.timing_log, 'a', encoding='utf-8') as f:
+                f.write(json.dumps({
+                    'name': name, 'quality': args.quality, 'output': output_filepath,
+                    'seconds': round(time.time() - start_t, 3),
+                }) + "\n")
+        return True
+    except Exception as e:
+        print(f"❌ 渲染失败: {name}: {e}")
+        # 释放认领，本进程或其他进程在收尾重试轮里接手
+        if args.claim_dir:
+            release_task(args.claim_dir, name)
+        return False
 
 def main():
-    if 'PIL' not in sys.modules:
-        print("请确保安装了 Pillow 库 (pip install pillow)")
+    args = get_args()
+    if 'PIL' not in sys.modules or 'packing' not in sys.modules:
+        print("请确保安装了 Pillow 与 scipy 库 (pip install pillow scipy)")
         return
-    print(f"=== 开始高清(4K, 无降噪)渲染 ===")
-    tasks = []
-    for root, dirs, files in os.walk(SOURCE_ROOT_DIR):
-        if "mask_0.png" in files:
-            folder_name = os.path.basename(root)
-            tasks.append((root, folder_name))
-    tasks.sort(key=lambda x: x[1])
+    preset = RENDER_PRESETS[args.quality]
+    time_limit = preset['time_limit'] if args.time_budget is None else args.time_budget
+    print(f"=== 开始渲染 | 档位 {args.quality} | {preset['resolution'][0]}x{preset['resolution'][1]}, {preset['samples']} spp, 降噪 {'开' if preset['denoise'] else '关'}, "
+          f"时限 {f'{time_limit:g}s' if time_limit else '无'} ===")
+    os.makedirs(args.output_dir, exist_ok=True)
+    tasks = load_tasks(args)
+    render_size = None if args.keep_master else args.output_size
+    persistent_scene = PersistentScene(args.quality, args.mesh_builder, args.crumple, render_size, args.time_budget) if args.persistent_scene else None
+    failed = []
     for i, (path, name) in enumerate(tasks):
-        target_png = os.path.join(RENDER_OUTPUT_DIR, f"{name}.png")
-        if os.path.exists(target_png):
+        if os.path.exists(output_path_for(args.output_dir, name, args.output_format)):
             print(f"[{i+1}/{len(tasks)}] 跳过 {name}")
             continue
+        if args.claim_dir and not claim_task(args.claim_dir, name):
+            print(f"[{i+1}/{len(tasks)}] 跳过 {name} (已被其他进程认领)")
+            continue
         print(f"[{i+1}/{len(tasks)}] 正在渲染: {name} ...")
-        process_single_folder(path, name)
+        if not render_task(args, persistent_scene, path, name):
+            failed.append((path, name))
+
+    # 收尾重试一轮：队列模式下扫描全部任务，顺带接手其他进程失败后释放的文档；
+    # 进程硬崩溃时认领文件不会释放，这些文档要等下次运行 render_driver（重建 .render_queue）再渲染
+    retry = tasks if args.claim_dir else failed
+    for path, name in retry:
+        if os.path.exists(output_path_for(args.output_dir, name, args.output_format)):
+            continue
+        if args.claim_dir and not claim_task(args.claim_dir, name):
+            continue
+        print(f"[重试] 正在渲染: {name} ...")
+        render_task(args, persistent_scene, path, name)
     print("\n✅ 完成")
 
 if __name__ == "__main__":
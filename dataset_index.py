@@ -0,0 +1,143 @@
+import os
+import time
+import sqlite3
+import argparse
+import concurrent.futures
+
+from response_cache import file_sha256
+
+DEFAULT_INDEX_PATH = "dataset_index.sqlite"
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+GT_EXTENSIONS = ('.md',)
+HASH_WORKERS = 8
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    kind TEXT,              -- 'image' | 'gt'
+    root TEXT,
+    rel_path TEXT,
+    sample_id TEXT,         -- rel_path without extension, '/'-separated
+    granularity TEXT,       -- data_8 / data_12 / data_16 for images, NULL for ground truth
+    category TEXT,
+    subcategory TEXT,
+    size INTEGER,
+    mtime_ns INTEGER,
+    sha256 TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_files_root ON files(root, kind);
+CREATE INDEX IF NOT EXISTS idx_files_sample ON files(kind, sample_id);
+CREATE VIEW IF NOT EXISTS samples AS
+SELECT img.sample_id, img.granularity,
+       COALESCE(gt.category, img.category) AS category, COALESCE(gt.subcategory, img.subcategory) AS subcategory,
+       img.path AS image_path, img.size AS image_size, img.sha256 AS image_sha256,
+       gt.path AS gt_path, gt.size AS gt_size, gt.sha256 AS gt_sha256
+FROM files img LEFT JOIN files gt ON gt.kind = 'gt' AND gt.sample_id = img.sample_id
+WHERE img.kind = 'image';
+"""
+
+def get_args():
+    parser = argparse.ArgumentParser(description="Build/refresh the dataset manifest shared by inference and metrics")
+    parser.add_argument('--index', type=str, default=DEFAULT_INDEX_PATH, help='SQLite manifest path')
+    parser.add_argument('--gt_root', type=str, default='my_dataset', help='Root directory of ground truth')
+    parser.add_argument('--input_roots', nargs='+', default=['data_8', 'data_12', 'data_16'], help='Shredded image directories')
+    return parser.parse_args()
+
+def parse_category(rel_path):
+    parts = os.path.normpath(rel_path).split(os.sep)
+    category = parts[0] if len(parts) > 0 else "unknown"
+    if category == 'table':
+        subcategory = 'table'
+    elif len(parts) > 1:
+        subcategory = parts[1]
+    else:
+        subcategory = "unknown"
+    return category, subcategory
+
+def open_index(index_path=DEFAULT_INDEX_PATH):
+    conn = sqlite3.connect(index_path)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(SCHEMA)
+    return conn
+
+def scan_files(root, extensions):
+    """{path: (rel_path, size, mtime_ns)} for every matching file under root."""
+    found = {}
+    for current_root, dirs, files in os.walk(root):
+        for name in files:
+            if name.lower().endswith(extensions):
+                path = os.path.join(current_root, name)
+                st = os.stat(path)
+                found[path] = (os.path.relpath(path, root), st.st_size, st.st_mtime_ns)
+    return found
+
+def update_root(conn, root, kind, extensions):
+    """
+    Sync the rows of one root with the filesystem. Only files whose size
+    or mtime changed since the last build are re-hashed; vanished files
+    are dropped. Returns (total, new, changed, removed).
+    """
+    known = {row['path']: (row['size'], row['mtime_ns'])
+             for row in conn.execute("SELECT path, size, mtime_ns FROM files WHERE root = ? AND kind = ?", (root, kind))}
+    found = scan_files(root, extensions)
+    stale = [path for path, (_, size, mtime_ns) in found.items() if known.get(path) != (size, mtime_ns)]
+    removed = [path for path in known if path not in found]
+
+    granularity = os.path.basename(os.path.normpath(root)) if kind == 'image' else None
+    # hashlib 计算时释放 GIL，线程池即可并行读盘+哈希
+    with concurrent.futures.ThreadPoolExecutor(max_workers=HASH_WORKERS) as executor:
+        hashes = dict(zip(stale, executor.map(file_sha256, stale)))
+    rows = []
+    for path in stale:
+        rel_path, size, mtime_ns = found[path]
+        category, subcategory = parse_category(rel_path)
+        sample_id = os.path.splitext(rel_path)[0].replace(os.sep, '/')
+        rows.append((path, kind, root, rel_path, sample_id, granularity, category, subcategory, size, mtime_ns, hashes[path]))
+    conn.executemany("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    conn.executemany("DELETE FROM files WHERE path = ?", [(path,) for path in removed])
+    conn.commit()
+    new = sum(1 for path in stale if path not in known)
+    return len(found), new, len(stale) - new, len(removed)
+
+def build_index(index_path=DEFAULT_INDEX_PATH, gt_root=None, input_roots=()):
+    """Open the manifest and bring the given roots up to date; returns the connection."""
+    conn = open_index(index_path)
+    roots = [(gt_root, 'gt', GT_EXTENSIONS)] if gt_root else []
+    roots += [(root, 'image', IMAGE_EXTENSIONS) for root in input_roots]
+    for root, kind, extensions in roots:
+        if not os.path.exists(root):
+            print(f"Warning: '{root}' does not exist, not indexed.")
+            continue
+        start = time.time()
+        total, new, changed, removed = update_root(conn, root, kind, extensions)
+        print(f"Index {root}: {total} files ({new} new, {changed} changed, {removed} removed) in {time.time() - start:.2f}s")
+    return conn
+
+def query_images(conn, roots):
+    placeholders = ", ".join("?" * len(roots))
+    return conn.execute(
+        f"SELECT * FROM files WHERE kind = 'image' AND root IN ({placeholders}) ORDER BY path", list(roots)
+    ).fetchall()
+
+def query_ground_truth(conn, gt_root, category=None):
+    sql = "SELECT * FROM files WHERE kind = 'gt' AND root = ?"
+    params = [gt_root]
+    if category is not None:
+        sql += " AND category = ?"
+        params.append(category)
+    return conn.execute(sql + " ORDER BY path", params).fetchall()
+
+def main():
+    args = get_args()
+    conn = build_index(args.index, args.gt_root, args.input_roots)
+    print("-" * 50)
+    for row in conn.execute(
+        "SELECT granularity, COUNT(*) AS n, COUNT(gt_path) AS with_gt, SUM(image_size) AS bytes "
+        "FROM samples GROUP BY granularity ORDER BY granularity"
+    ):
+        print(f"{row['granularity']:<10} {row['n']:>6} images | {row['with_gt']:>6} with ground truth | {(row['bytes'] or 0) / 1024 / 1024:.1f} MB")
+    conn.close()
+    print(f"Manifest: {os.path.abspath(args.index)}")
+
+if __name__ == "__main__":
+    main()
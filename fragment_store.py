@@ -0,0 +1,141 @@
+import os
+import json
+import math
+import numpy as np
+from PIL import Image
+
+ATLAS_IMAGE = "atlas.png"
+ATLAS_INDEX = "atlas.json"
+ATLAS_GUTTER = 4
+FRAGMENTS_DATA = "fragments.bin"
+FRAGMENTS_INDEX = "fragments.json"
+
+def shelf_pack(sizes, gutter=ATLAS_GUTTER):
+    """
+    Pack (w, h) rectangles into shelves, tallest first. Returns the atlas size
+    (W, H) and one (x, y) top-left corner per input rectangle.
+    """
+    if not sizes:
+        return (0, 0), []
+    total_area = sum((w + gutter) * (h + gutter) for w, h in sizes)
+    atlas_w = max(max(w for w, _ in sizes) + gutter, int(math.ceil(math.sqrt(total_area))))
+    order = sorted(range(len(sizes)), key=lambda k: sizes[k][1], reverse=True)
+    positions = [None] * len(sizes)
+    x, y, shelf_h = 0, 0, 0
+    for k in order:
+        w, h = sizes[k]
+        if x + w > atlas_w:
+            x, y, shelf_h = 0, y + shelf_h + gutter, 0
+        positions[k] = (x, y)
+        x += w + gutter
+        shelf_h = max(shelf_h, h)
+    return (atlas_w, y + shelf_h), positions
+
+def write_atlas(output_dir, pieces):
+    """
+    Write every (idx, box, mask_crop, tex_crop) piece into one RGBA atlas.png
+    with the mask in alpha, plus atlas.json with each piece's rect [x, y, w, h]
+    and its box in the full-page render.
+    """
+    sizes = [(tex.shape[1], tex.shape[0]) for _, _, _, tex in pieces]
+    (atlas_w, atlas_h), positions = shelf_pack(sizes)
+    atlas = np.zeros((atlas_h, atlas_w, 4), dtype=np.uint8)
+    entries = []
+    for (idx, box, mask_crop, tex_crop), (x, y), (w, h) in zip(pieces, positions, sizes):
+        atlas[y:y+h, x:x+w, :3] = tex_crop[..., :3]
+        atlas[y:y+h, x:x+w, 3] = mask_crop
+        entries.append({'idx': int(idx), 'rect': [x, y, w, h], 'box': [int(v) for v in box]})
+
+    Image.fromarray(atlas, 'RGBA').save(os.path.join(output_dir, ATLAS_IMAGE))
+    with open(os.path.join(output_dir, ATLAS_INDEX), 'w', encoding='utf-8') as f:
+        json.dump({'size': [atlas_w, atlas_h], 'pieces': entries}, f, indent=2)
+
+def load_atlas_index(folder_path):
+    index_path = os.path.join(folder_path, ATLAS_INDEX)
+    if not os.path.exists(index_path):
+        return None
+    with open(index_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def write_fragments(output_dir, pieces):
+    """
+    Write every (idx, box, mask_crop, tex_crop) piece as raw uint8 into one
+    fragments.bin, with byte offsets and shapes in fragments.json. The index
+    is written last, so a folder with fragments.json always has complete data.
+    """
+    entries = []
+    offset = 0
+    with open(os.path.join(output_dir, FRAGMENTS_DATA), 'wb') as f:
+        for idx, box, mask_crop, tex_crop in pieces:
+            mask_bytes = np.ascontiguousarray(mask_crop, dtype=np.uint8)
+            tex_bytes = np.ascontiguousarray(tex_crop[..., :3], dtype=np.uint8)
+            entries.append({
+                'idx': int(idx), 'box': [int(v) for v in box], 'shape': list(mask_bytes.shape),
+                'mask_offset': offset, 'tex_offset': offset + mask_bytes.nbytes,
+            })
+            f.write(mask_bytes.tobytes())
+            f.write(tex_bytes.tobytes())
+            offset += mask_bytes.nbytes + tex_bytes.nbytes
+
+    with open(os.path.join(output_dir, FRAGMENTS_INDEX), 'w', encoding='utf-8') as f:
+        json.dump({'pieces': entries}, f, indent=2)
+
+def open_fragments(folder_path):
+    """
+    Memory-map a document's fragments.bin. Returns {idx: (mask, tex, box)}
+    where mask is an (h, w) and tex an (h, w, 3) read-only uint8 view, or
+    None if the folder has no fragment store.
+    """
+    index_path = os.path.join(folder_path, FRAGMENTS_INDEX)
+    if not os.path.exists(index_path):
+        return None
+    with open(index_path, 'r', encoding='utf-8') as f:
+        index = json.load(f)
+    if not index['pieces']:
+        return {}
+    data = np.memmap(os.path.join(folder_path, FRAGMENTS_DATA), dtype=np.uint8, mode='r')
+    fragments = {}
+    for entry in index['pieces']:
+        h, w = entry['shape']
+        mask = data[entry['mask_offset']:entry['mask_offset'] + h * w].reshape(h, w)
+        tex = data[entry['tex_offset']:entry['tex_offset'] + h * w * 3].reshape(h, w, 3)
+        fragments[entry['idx']] = (mask, tex, entry['box'])
+    return fragments
+
+def has_fragments(files):
+    """True if a directory listing holds a document in any supported format."""
+    return "mask_0.png" in files or ATLAS_INDEX in files or FRAGMENTS_INDEX in files
+
+def iter_masks(folder_path):
+    """
+    Yield (idx, mask PIL image in 'L' mode) for every piece of a document.
+    The fragment store is preferred (no decoding), then the atlas alpha
+    channel, then mask_i.png.
+    """
+    fragments = open_fragments(folder_path)
+    if fragments is not None:
+        for idx in sorted(fragments):
+            yield idx, Image.fromarray(fragments[idx][0], 'L')
+        return
+
+    index = load_atlas_index(folder_path)
+    if index is not None:
+        with Image.open(os.path.join(folder_path, ATLAS_IMAGE)) as atlas:
+            alpha = atlas.getchannel('A')
+        for entry in sorted(index['pieces'], key=lambda e: e['idx']):
+            x, y, w, h = entry['rect']
+            yield entry['idx'], alpha.crop((x, y, x + w, y + h))
+        return
+
+    # 按数字 idx 排序，与 fragments/atlas 一致；按文件名排会得到 mask_10 < mask_2，同一种子下旋转角就对不上
+    masks = []
+    for mask_file in os.listdir(folder_path):
+        if not (mask_file.startswith("mask_") and mask_file.endswith(".png")):
+            continue
+        try:
+            masks.append((int(mask_file.split("_")[1].split(".")[0]), mask_file))
+        except ValueError:
+            continue
+    for idx, mask_file in sorted(masks):
+        with Image.open(os.path.join(folder_path, mask_file)) as img:
+            yield idx, img.convert('L')
@@ -0,0 +1,482 @@
+import os
+import re
+import json
+import time
+import asyncio
+import argparse
+import contextlib
+import functools
+import concurrent.futures
+import httpx
+import openai
+from PIL import Image
+from openai import AsyncOpenAI, OpenAI
+
+from providers import PROVIDERS, get_provider
+from dataset_index import DEFAULT_INDEX_PATH, build_index, query_images
+from rate_limit import RateLimiter, backoff_delay, parse_retry_after
+from response_cache import DEFAULT_CACHE_PATH, DEFAULT_MAX_MB, ResponseCache, make_key
+from image_payload import PAYLOAD_CACHE_DIR, prepare_payload, read_payload_base64
+from stream_writer import StreamCheckpoint
+from batch_inference import (BATCH_DIR, DEFAULT_MAX_FILE_MB, collect_shards, is_finished, load_manifest,
+                             poll_shards, submit_shards, write_shards)
+
+DEFAULT_PROVIDER = "dashscope"
+# TPM 预估：Qwen-VL 每 28x28 像素一个视觉 token，输出按思考+正文的常见长度估计
+IMAGE_TOKEN_PIXELS = 28 * 28
+EXPECTED_OUTPUT_TOKENS = 2048
+IMAGE_MAX_SIZE = 2048
+JPEG_QUALITY = 95
+# 可以按 provider 覆盖的连接/限流参数
+PROVIDER_SETTINGS = ('base_url', 'api_key', 'workers', 'max_workers', 'rpm', 'tpm', 'timeout')
+
+# --- Core Prompt (Unchanged) ---
+PROMPT = r"""You are an AI assistant specialized in reconstructing and converting torn document fragments to Markdown format. The input image contains scattered fragments of a single original document. Your task is to mentally "stitch" them together and recover the original content exactly as it was.
+
+Please follow these instructions for the reconstruction and conversion:
+
+1. Reconstruction & Text Processing:
+   - **Stitching Logic**: Visually analyze the fragments to determine their logical order. If a sentence or word is cut by a tear (e.g., "pro" on one piece, "cess" on another), merge them into the complete word ("process").
+   - **Ignore Artifacts**: Ignore physical damage, tear lines, shadows, and background noise. Do not output text describing the damage.
+   - **Verbatim Transcription**: Accurately recognize all text. **Do not summarize, interpret, or hallucinate content.** If the document appears to be code, transcribe the code exactly.
+   - Convert the reconstructed text into Markdown format.
+   - Maintain the original document structure (headings, paragraphs, lists).
+
+2. Mathematical Formula Processing:
+   - Convert all mathematical formulas to LaTeX format.
+   - **Reconstruction**: If a formula is split across fragments, reconstruct the valid, complete LaTeX formula.
+   - Enclose inline formulas with \( \). For example: This is an inline formula \( E = mc^2 \)
+   - Enclose block formulas with \\[ \\]. For example: \[ \frac{-b \pm \sqrt{b^2 - 4ac}}{2a} \]
+
+3. Table Processing:
+   - Convert tables to HTML format.
+   - **Reconstruction**: Realign columns or rows that are split across fragments.
+   - Wrap the entire table with <table> and </table>.
+
+4. Figure Handling:
+   - Ignore figures content in the image. Do not attempt to describe or convert images.
+
+5. Output Format:
+   - Ensure the output Markdown document has a clear structure with appropriate line breaks between elements.
+   - **Strict Constraint**: Output ONLY the converted Markdown content. Do not add any introductory text (like "Here is the reconstructed text") or concluding remarks.
+
+Please strictly follow these guidelines. Your primary goal is high-fidelity restoration of the text, formulas, and tables into the specified format.
+"""
+
+def get_args(default_model=None, default_output_dir=None, description="Document Restoration Inference Runner"):
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('--models', nargs='+', default=None, help='Runs as [provider:]model[=output_dir], e.g. dashscope:qwen3-vl-plus vllm:Qwen/Qwen3-VL-8B-Instruct=inference_results_qwen3_8b')
+    parser.add_argument('--provider', type=str, default=DEFAULT_PROVIDER, choices=sorted(PROVIDERS), help='Provider for model specs without a prefix')
+    parser.add_argument('--model', type=str, default=default_model, help='Single model to run when --models is not given')
+    parser.add_argument('--output_dir', type=str, default=default_output_dir, help='Output root of --model (default: inference_results_<model>)')
+    parser.add_argument('--input_roots', nargs='+', default=['data_8', 'data_12', 'data_16'], help='List of input root directories')
+    parser.add_argument('--filter', nargs='+', default=None, help='List of keywords to filter (e.g. python java)')
+    parser.add_argument('--index', type=str, default=DEFAULT_INDEX_PATH, help='Dataset manifest (refreshed incrementally by mtime before each run)')
+    parser.add_argument('--provider_config', type=str, default=None, help='JSON file of per-provider overrides, e.g. {"vllm": {"base_url": "http://gpu01:8000/v1", "workers": 128}}')
+    parser.add_argument('--base_url', type=str, default=None, help='Base URL (overrides every provider in this run)')
+    parser.add_argument('--api_key', type=str, default=None, help='API Key (default: the provider\'s environment variable)')
+    parser.add_argument('--workers', type=int, default=None, help='Initial in-flight requests per provider (adapted with AIMD)')
+    parser.add_argument('--max_workers', type=int, default=None, help='Upper bound for the adaptive concurrency (default: 4x --workers)')
+    parser.add_argument('--rpm', type=int, default=None, help='Requests-per-minute limit of the provider')
+    parser.add_argument('--tpm', type=int, default=None, help='Tokens-per-minute limit of the provider')
+    parser.add_argument('--timeout', type=float, default=None, help='Per-request timeout in seconds')
+    parser.add_argument('--max_retries', type=int, default=5, help='Attempts per image, including rate-limited ones')
+    parser.add_argument('--cache', type=str, default=DEFAULT_CACHE_PATH, help='SQLite response cache keyed by (model, prompt, image bytes, params)')
+    parser.add_argument('--cache_max_mb', type=float, default=DEFAULT_MAX_MB, help='Evict least-recently-used responses beyond this size')
+    parser.add_argument('--no_cache', action='store_true', help='Neither read nor write the response cache')
+    parser.add_argument('--payload_cache', type=str, default=PAYLOAD_CACHE_DIR, help='Directory of pre-encoded image payloads')
+    parser.add_argument('--resume_partial', action='store_true', help='Continue interrupted generations from their .partial text (providers with prefix continuation only)')
+    parser.add_argument('--prep_workers', type=int, default=os.cpu_count(), help='Processes that resize/encode payloads ahead of the requests')
+    parser.add_argument('--batch', action='store_true', help='Submit through the Batch API (JSONL upload + polling) instead of live streaming requests')
+    parser.add_argument('--batch_dir', type=str, default=BATCH_DIR, help='Batch JSONL shards and manifests, one subdirectory per output root')
+    parser.add_argument('--batch_max_mb', type=float, default=DEFAULT_MAX_FILE_MB, help='Split batch input files above this size')
+    parser.add_argument('--completion_window', type=str, default='24h', help='Batch completion window')
+    parser.add_argument('--poll_interval', type=float, default=60.0, help='Seconds between batch status checks')
+    return parser.parse_args()
+
+def output_dir_for(model_name):
+    return "inference_results_" + re.sub(r'[^0-9a-zA-Z]+', '_', model_name.split('/')[-1]).strip('_').lower()
+
+def parse_model_spec(spec, default_provider):
+    """'[provider:]model[=output_dir]' -> (provider name, model, output_dir)."""
+    spec, _, output_dir = spec.partition('=')
+    provider_name, sep, model_name = spec.partition(':')
+    if not sep or provider_name not in PROVIDERS:
+        provider_name, model_name = default_provider, spec
+    return provider_name, model_name, output_dir or output_dir_for(model_name)
+
+def load_providers(args, provider_names):
+    overrides = {}
+    if args.provider_config:
+        with open(args.provider_config, 'r', encoding='utf-8') as f:
+            overrides = json.load(f)
+    # 命令行给出的值对本次所有 provider 生效，其余沿用配置文件/默认值
+    cli = {key: getattr(args, key) for key in PROVIDER_SETTINGS if getattr(args, key) is not None}
+    return {name: get_provider(name, **{**overrides.get(name, {}), **cli}) for name in provider_names}
+
+def estimate_request_tokens(image_path, max_size=IMAGE_MAX_SIZE):
+    # 只读图像头，不解码
+    try:
+        with Image.open(image_path) as img:
+            width, height = img.size
+    except Exception:
+        return len(PROMPT) // 4 + EXPECTED_OUTPUT_TOKENS
+    scale = min(1.0, max_size / max(width, height))
+    image_tokens = int(width * scale) * int(height * scale) // IMAGE_TOKEN_PIXELS
+    return len(PROMPT) // 4 + image_tokens + EXPECTED_OUTPUT_TOKENS
+
+def build_client(api_key, base_url, concurrency, timeout=180.0):
+    """
+    One AsyncOpenAI client over one pooled httpx connection pool, shared by
+    every request, so TLS and connection setup are paid once per connection
+    instead of once per image.
+    """
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+        timeout=httpx.Timeout(timeout, connect=10.0),
+    )
+    # 重试统一交给 RateLimiter 调度，SDK 自带的重试会绕过限流
+    return AsyncOpenAI(api_key=api_key, base_url=base_url, http_client=http_client, max_retries=0)
+
+def build_messages(base64_image, mime='image/jpeg'):
+    return [
+        {
+            "role": "user",
+            "content": [
+                {"type": "text", "text": PROMPT},
+                {
+                    "type": "image_url",
+                    "image_url": {
+                        "url": f"data:{mime};base64,{base64_image}",
+                    }
+                }
+            ]
+        }
+    ]
+
+async def process_image_with_model(client, provider, model_name, base64_image, mime='image/jpeg', checkpoint=None, resume_prefix=""):
+    """
+    Process image using the streaming API of `provider`.
+    Returns (answer, thinking, usage dict or None); API errors propagate so
+    the caller can tell 429s apart. Deltas are mirrored to `checkpoint` as
+    they arrive; `resume_prefix` continues an interrupted answer.
+    """
+    response_stream = await client.chat.completions.create(
+        **provider.chat_request(model_name, build_messages(base64_image, mime), resume_prefix)
+    )
+
+    full_content = [resume_prefix]
+    full_reasoning = []
+    usage = None
+    async for chunk in response_stream:
+        if chunk.usage:
+            usage = chunk.usage.model_dump()
+        if not chunk.choices:
+            continue
+
+        delta = chunk.choices[0].delta
+        if delta.content:
+            full_content.append(delta.content)
+        reasoning = getattr(delta, "reasoning_content", None)
+        if reasoning:
+            full_reasoning.append(reasoning)
+        if checkpoint is not None and (delta.content or reasoning):
+            checkpoint.on_delta(delta.content, reasoning)
+
+    return "".join(full_content), "".join(full_reasoning), usage
+
+def handle_request_error(e, limiter, input_path, attempt):
+    """Seconds to back off before the next attempt, or None if retrying is pointless."""
+    if isinstance(e, openai.RateLimitError):
+        # 由限流器统一暂停所有请求，本任务随后重新排队
+        wait = limiter.on_rate_limit(parse_retry_after(e.response.headers), attempt)
+        print(f"[429] {os.path.basename(input_path)}: pausing {wait:.1f}s, concurrency -> {limiter.limit}")
+        return 0.0
+    if isinstance(e, openai.APIStatusError):
+        print(f"[API Error] {os.path.basename(input_path)}: HTTP {e.status_code}: {e.message}")
+        # 其他 4xx 重试也不会成功，不浪费请求
+        return None if e.status_code < 500 else backoff_delay(attempt)
+    print(f"[API Error] Request Failed: {e}")
+    return backoff_delay(attempt)
+
+def request_cache_key(provider, model_name, image_sha256):
+    params = {**provider.cache_params(), 'max_size': IMAGE_MAX_SIZE, 'quality': JPEG_QUALITY}
+    return make_key(model_name, PROMPT, image_sha256, params)
+
+def save_markdown(output_path, markdown_content):
+    cleaned_content = markdown_content.replace("```markdown", "").replace("```", "").strip()
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.write(cleaned_content)
+
+def scan_inputs(input_roots, keywords=None, index_path=DEFAULT_INDEX_PATH):
+    """(input_path, relative .md name) for every image, read from the dataset manifest."""
+    conn = build_index(index_path, input_roots=input_roots)
+    try:
+        rows = query_images(conn, input_roots)
+    finally:
+        conn.close()
+    samples = []
+    for row in rows:
+        if keywords:
+            normalized_path = row['path'].replace("\\", "/").lower()
+            if not any(keyword.lower() in normalized_path for keyword in keywords):
+                continue
+        samples.append((row['path'], os.path.join(row['granularity'], row['sample_id']) + ".md"))
+    return samples
+
+def existing_outputs(output_dir):
+    """Relative paths of every file already under output_dir: one walk instead of a stat per sample."""
+    found = set()
+    for current_root, dirs, files in os.walk(output_dir):
+        for name in files:
+            found.add(os.path.relpath(os.path.join(current_root, name), output_dir))
+    return found
+
+class ModelRun:
+    """One (provider, model, output root) and the images it still has to answer."""
+    def __init__(self, provider, model_name, output_dir):
+        self.provider = provider
+        self.model = model_name
+        self.output_dir = output_dir
+        self.tasks = []
+        self.skipped = 0
+        self.interrupted = 0
+
+    def plan(self, samples):
+        existing = existing_outputs(self.output_dir)
+        for input_path, md_name in samples:
+            output_path = os.path.join(self.output_dir, md_name)
+            if os.path.normpath(md_name) in existing:
+                self.skipped += 1
+                continue
+            if os.path.normpath(md_name) + ".meta.json" in existing:
+                previous = StreamCheckpoint(output_path).previous()
+                if previous and previous['status'] == 'interrupted':
+                    self.interrupted += 1
+            self.tasks.append((input_path, output_path))
+
+    @property
+    def label(self):
+        return f"{self.provider.name}:{self.model}"
+
+async def worker_task(client, limiter, run, input_path, output_path, payload_future, max_retries=5, cache=None, resume_partial=False):
+    provider, model_name = run.provider, run.model
+    if os.path.exists(output_path):
+        return f"[Skip] {os.path.basename(input_path)} (Already exists)"
+
+    # 缩放/编码在进程池里提前完成，且同一张图只做一次，所有模型共用
+    payload = await payload_future
+    if payload is None:
+        return f"[Fail] Encoding {os.path.basename(input_path)}"
+    payload_path, mime, image_sha256 = payload
+
+    cache_key = None
+    if cache is not None:
+        cache_key = request_cache_key(provider, model_name, image_sha256)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            save_markdown(output_path, cached['content'])
+            return f"[Cached] {os.path.basename(input_path)} -> {os.path.basename(output_path)}"
+
+    checkpoint = StreamCheckpoint(output_path)
+    previous = checkpoint.previous()
+    if previous and previous['status'] == 'interrupted':
+        print(f"[Interrupted] {os.path.basename(input_path)}: previous attempt stopped after "
+              f"{previous.get('content_chars', 0)} chars ({previous.get('error')})")
+
+    estimated_tokens = estimate_request_tokens(input_path)
+    base64_img = None
+    markdown_content = None
+
+    for attempt in range(max_retries):
+        delay = 0.0
+        async with limiter.slot(estimated_tokens):
+            # 拿到并发名额后才读入：同一时刻只有在途请求的 base64 驻留内存
+            if base64_img is None:
+                base64_img = await asyncio.to_thread(read_payload_base64, payload_path)
+            resume_prefix = checkpoint.load_partial() if resume_partial and provider.supports_prefix else ""
+            checkpoint.begin(model_name, attempt, resume_prefix)
+            try:
+                markdown_content, reasoning_content, usage = await process_image_with_model(
+                    client, provider, model_name, base64_img, mime, checkpoint, resume_prefix
+                )
+                if markdown_content:
+                    checkpoint.finish(usage)
+                    await limiter.on_success(estimated_tokens, usage['total_tokens'] if usage else None)
+                    if cache is not None:
+                        cache.put(cache_key, model_name, markdown_content, reasoning_content, usage)
+                    break
+                checkpoint.fail("empty response")
+                delay = backoff_delay(attempt)
+            except BaseException as e:
+                # 已经流回来的 token 留在 .partial 里，meta 标记为 interrupted
+                checkpoint.fail(e)
+                if not isinstance(e, Exception):
+                    raise
+                delay = handle_request_error(e, limiter, input_path, attempt)
+                if delay is None:
+                    break
+        if delay:
+            await asyncio.sleep(delay)
+
+    if markdown_content:
+        save_markdown(output_path, markdown_content)
+        return f"[Done] {os.path.basename(input_path)} -> {os.path.basename(output_path)}"
+    else:
+        return f"[Fail] Processing {os.path.basename(input_path)} after retries"
+
+async def run_tasks(args, runs, providers, cache=None):
+    loop = asyncio.get_running_loop()
+    total = sum(len(run.tasks) for run in runs)
+    with concurrent.futures.ProcessPoolExecutor(max_workers=args.prep_workers) as prep_pool:
+        async with contextlib.AsyncExitStack() as stack:
+            # 每个 provider 一个连接池和一个限流器，同一 provider 下的模型共用
+            clients, limiters = {}, {}
+            for name, provider in providers.items():
+                pool_size = provider.max_workers or provider.workers * 4
+                clients[name] = await stack.enter_async_context(
+                    build_client(provider.api_key, provider.base_url, pool_size, provider.timeout)
+                )
+                limiters[name] = RateLimiter(provider.workers, rpm=provider.rpm, tpm=provider.tpm, max_concurrency=provider.max_workers)
+
+            payloads = {}
+            pending = []
+            for run in runs:
+                for input_path, output_path in run.tasks:
+                    if input_path not in payloads:
+                        payloads[input_path] = loop.run_in_executor(
+                            prep_pool, prepare_payload, input_path, args.payload_cache, IMAGE_MAX_SIZE, JPEG_QUALITY
+                        )
+                    name = run.provider.name
+                    pending.append(worker_task(
+                        clients[name], limiters[name], run, input_path, output_path, payloads[input_path],
+                        args.max_retries, cache, args.resume_partial,
+                    ))
+            for processed_count, next_done in enumerate(asyncio.as_completed(pending), 1):
+                result = await next_done
+                print(f"[{processed_count}/{total}] {result}")
+
+def batch_requests(run, payloads, cache=None):
+    """Yield (custom_id, body, meta) for every task of `run` not already answered by the response cache."""
+    for index, (input_path, output_path) in enumerate(run.tasks):
+        payload = payloads.get(input_path)
+        if payload is None:
+            continue
+        payload_path, mime, image_sha256 = payload
+        if cache is not None:
+            cached = cache.get(request_cache_key(run.provider, run.model, image_sha256))
+            if cached is not None:
+                save_markdown(output_path, cached['content'])
+                continue
+        body = run.provider.batch_body(run.model, build_messages(read_payload_base64(payload_path), mime))
+        meta = {'input': input_path, 'output': output_path, 'model': run.model, 'image_sha256': image_sha256}
+        yield f"req-{index:06d}", body, meta
+
+def run_batch(args, runs, cache=None):
+    jobs = []
+    for run in runs:
+        if not run.provider.supports_batch:
+            print(f"Warning: {run.provider.name} has no Batch API, skipping {run.label} (run it without --batch)")
+            continue
+        batch_dir = os.path.join(args.batch_dir, os.path.basename(os.path.normpath(run.output_dir)))
+        jobs.append((run, batch_dir, load_manifest(batch_dir)))
+
+    # 所有需要新建批次的模型共用一次图片编码
+    inputs = sorted({input_path for run, _, manifest in jobs if not (manifest and not is_finished(manifest)) for input_path, _ in run.tasks})
+    payloads = {}
+    if inputs:
+        prepare = functools.partial(prepare_payload, cache_dir=args.payload_cache, max_size=IMAGE_MAX_SIZE, quality=JPEG_QUALITY)
+        with concurrent.futures.ProcessPoolExecutor(max_workers=args.prep_workers) as prep_pool:
+            payloads = dict(zip(inputs, prep_pool.map(prepare, inputs, chunksize=4)))
+
+    clients = {}
+    submitted = []
+    for run, batch_dir, manifest in jobs:
+        provider = run.provider
+        if provider.name not in clients:
+            clients[provider.name] = OpenAI(api_key=provider.api_key, base_url=provider.base_url, timeout=max(provider.timeout, 600.0))
+        client = clients[provider.name]
+        if manifest and not is_finished(manifest):
+            # 上次提交的批次还没取回：继续轮询，不重复提交
+            print(f"[{run.label}] Resuming unfinished batch run in {batch_dir} ({len(manifest['shards'])} shards)")
+        else:
+            manifest = write_shards(batch_requests(run, payloads, cache), batch_dir, args.batch_max_mb)
+            count = sum(len(shard['requests']) for shard in manifest['shards'])
+            print(f"[{run.label}] Wrote {count} requests into {len(manifest['shards'])} batch file(s) under {batch_dir}")
+        submit_shards(client, manifest, batch_dir, args.completion_window)
+        submitted.append((run, client, batch_dir, manifest))
+
+    for run, client, batch_dir, manifest in submitted:
+        def on_result(meta, message, usage, error):
+            name = os.path.basename(meta['input'])
+            if message is None or not message.get('content'):
+                print(f"[Fail] {name}: {error or 'empty response'}")
+                return
+            save_markdown(meta['output'], message['content'])
+            if cache is not None:
+                key = request_cache_key(run.provider, meta['model'], meta['image_sha256'])
+                cache.put(key, meta['model'], message['content'], message.get('reasoning_content'), usage)
+
+        poll_shards(client, manifest, batch_dir, args.poll_interval)
+        succeeded, failed = collect_shards(client, manifest, batch_dir, on_result)
+        print(f"[{run.label}] Batch results: {succeeded} saved | {failed} failed (rerun to retry the missing files)")
+
+def main(default_model=None, default_output_dir=None, description="Document Restoration Inference Runner"):
+    args = get_args(default_model, default_output_dir, description)
+
+    if args.models:
+        specs = [parse_model_spec(spec, args.provider) for spec in args.models]
+    elif args.model:
+        specs = [(args.provider, args.model, args.output_dir or output_dir_for(args.model))]
+    else:
+        print("Error: give --models or --model")
+        return
+    providers = load_providers(args, sorted({provider_name for provider_name, _, _ in specs}))
+    runs = [ModelRun(providers[provider_name], model_name, output_dir) for provider_name, model_name, output_dir in specs]
+
+    print(f"Input Roots: {args.input_roots}")
+    print(f"Filter: {args.filter if args.filter else 'None (Process All)'}")
+    print(f"Mode: {'Batch API' if args.batch else 'streaming'}")
+    for provider in providers.values():
+        print(f"Provider {provider.name}: {provider.base_url} | {provider.workers} in-flight (adaptive) | "
+              f"RPM: {provider.rpm or 'unlimited'} | TPM: {provider.tpm or 'unlimited'}")
+
+    print("Scanning files and checking existing results...")
+    samples = scan_inputs(args.input_roots, args.filter, args.index)
+    for run in runs:
+        run.plan(samples)
+
+    print("-" * 50)
+    print(f"Total files found (matching filter): {len(samples)}")
+    for run in runs:
+        print(f"{run.label} -> {run.output_dir}: {run.skipped} done, {len(run.tasks)} remaining")
+        if run.interrupted:
+            action = "resuming from .partial" if args.resume_partial and run.provider.supports_prefix else "restarting"
+            print(f"  Interrupted earlier (flagged in .meta.json): {run.interrupted}, {action}")
+    print("-" * 50)
+
+    runs = [run for run in runs if run.tasks]
+    if not runs:
+        print("All tasks are already completed!")
+        return
+
+    start_time = time.time()
+    cache = None if args.no_cache else ResponseCache(args.cache, args.cache_max_mb)
+    try:
+        if args.batch:
+            run_batch(args, runs, cache)
+        else:
+            asyncio.run(run_tasks(args, runs, {run.provider.name: run.provider for run in runs}, cache))
+    finally:
+        if cache is not None:
+            count, size = cache.stats()
+            print(f"Response cache: {count} entries, {size / 1024 / 1024:.1f} MB ({args.cache})")
+            cache.close()
+
+    end_time = time.time()
+    print(f"\nAll remaining tasks completed in {end_time - start_time:.2f} seconds.")
+    print(f"Results saved to: {', '.join(run.output_dir for run in runs)}")
+
+if __name__ == "__main__":
+    main()
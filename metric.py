@@ -6,6 +6,7 @@ from nltk.translate.bleu_score import sentence_bleu, SmoothingFunction
 from rouge_score import rouge_scorer
 import jieba
 import re
+from dataset_index import DEFAULT_INDEX_PATH, build_index, query_ground_truth
 
 # NLTK 平滑函数
 cc = SmoothingFunction()
@@ -14,29 +15,18 @@ def get_args():
     parser = argparse.ArgumentParser(description="Full Evaluation (CER, BLEU, ROUGE)")
     parser.add_argument('--pred_root', type=str, default='inference_results_qwen_plus', help='Root directory of inference results')
     parser.add_argument('--gt_root', type=str, default='my_dataset', help='Root directory of ground truth')
+    parser.add_argument('--index', type=str, default=DEFAULT_INDEX_PATH, help='Dataset manifest (refreshed incrementally by mtime)')
     parser.add_argument('--output_report', type=str, default='evaluation_report_full_qwen_plus.txt', help='Path to save the report')
     return parser.parse_args()
 
 def read_file(path):
-    if not os.path.exists(path):
-        return None
+    # 不存在的文件直接走异常分支，省掉一次 exists 的 stat
     try:
         with open(path, 'r', encoding='utf-8') as f:
             return f.read().strip()
     except Exception as e:
         return None
 
-def parse_category(rel_path):
-    parts = os.path.normpath(rel_path).split(os.sep)
-    category = parts[0] if len(parts) > 0 else "unknown"
-    if category == 'table':
-        subcategory = 'table'
-    elif len(parts) > 1:
-        subcategory = parts[1]
-    else:
-        subcategory = "unknown"
-    return category, subcategory
-
 def calculate_metrics(pred, gt):
     # 1. CER (Normalized Levenshtein Distance)
     dist = Levenshtein.distance(pred, gt)
@@ -83,32 +73,27 @@ def main():
     
     print(f"Start Full Evaluation...")
 
-    for dataset_name in datasets:
-        pred_dataset_dir = os.path.join(args.pred_root, dataset_name)
-        if not os.path.exists(pred_dataset_dir):
+    # 样本列表和类别来自数据集清单，不再逐个目录 os.walk
+    conn = build_index(args.index, gt_root=args.gt_root)
+    gt_rows = query_ground_truth(conn, args.gt_root)
+    conn.close()
+    pred_dirs = [d for d in datasets if os.path.isdir(os.path.join(args.pred_root, d))]
+
+    for row in gt_rows:
+        gt_content = read_file(row['path'])
+        if gt_content is None:
             continue
-            
-        for root, dirs, files in os.walk(pred_dataset_dir):
-            for file in files:
-                if not file.endswith('.md'):
-                    continue
-                
-                pred_path = os.path.join(root, file)
-                rel_path = os.path.relpath(pred_path, start=pred_dataset_dir)
-                gt_path = os.path.join(args.gt_root, rel_path)
-                
-                pred_content = read_file(pred_path)
-                gt_content = read_file(gt_path)
-                
-                if gt_content is None or pred_content is None:
-                    continue
-                
-                cer, bleu, rouge = calculate_metrics(pred_content, gt_content)
-                cat, sub = parse_category(rel_path)
-                records.append({
-                    'dataset': dataset_name, 'cat': cat, 'sub': sub,
-                    'cer': cer, 'bleu': bleu, 'rouge': rouge
-                })
+
+        for dataset_name in pred_dirs:
+            pred_content = read_file(os.path.join(args.pred_root, dataset_name, row['rel_path']))
+            if pred_content is None:
+                continue
+
+            cer, bleu, rouge = calculate_metrics(pred_content, gt_content)
+            records.append({
+                'dataset': dataset_name, 'cat': row['category'], 'sub': row['subcategory'],
+                'cer': cer, 'bleu': bleu, 'rouge': rouge
+            })
 
     if not records:
         print("No files evaluated.")
@@ -5,34 +5,24 @@ import markdown
 import re
 from tqdm import tqdm
 from table_recognition_metric import TEDS
+from dataset_index import DEFAULT_INDEX_PATH, build_index, query_ground_truth
 
 def get_args():
     parser = argparse.ArgumentParser(description="Table Evaluation (TEDS) Fixed")
     parser.add_argument('--pred_root', type=str, default='inference_results_mistral_reasoning_14b', help='Root directory of inference results')
     parser.add_argument('--gt_root', type=str, default='my_dataset', help='Root directory of ground truth')
+    parser.add_argument('--index', type=str, default=DEFAULT_INDEX_PATH, help='Dataset manifest (refreshed incrementally by mtime)')
     parser.add_argument('--output_report', type=str, default='evaluation_report_table_teds_mistral_reasoning_14b.txt', help='Path to save the report')
     return parser.parse_args()
 
 def read_file(path):
-    if not os.path.exists(path):
-        return None
+    # 不存在的文件直接走异常分支，省掉一次 exists 的 stat
     try:
         with open(path, 'r', encoding='utf-8') as f:
             return f.read().strip()
     except Exception as e:
         return None
 
-def parse_category(rel_path):
-    parts = os.path.normpath(rel_path).split(os.sep)
-    category = parts[0] if len(parts) > 0 else "unknown"
-    if category == 'table':
-        subcategory = 'table'
-    elif len(parts) > 1:
-        subcategory = parts[1]
-    else:
-        subcategory = "unknown"
-    return category, subcategory
-
 def clean_html_attributes(html_str):
     if not html_str: return html_str
     html_str = re.sub(r'colspan=["\']["\']', 'colspan="1"', html_str)
@@ -67,47 +57,38 @@ def main():
 
     print(f"Start Table Evaluation...")
 
+    conn = build_index(args.index, gt_root=args.gt_root)
+    gt_rows = query_ground_truth(conn, args.gt_root, category='table')
+    conn.close()
+
     for dataset_name in datasets:
         pred_dataset_dir = os.path.join(args.pred_root, dataset_name)
         if not os.path.exists(pred_dataset_dir):
             continue
-            
-        for root, dirs, files in os.walk(pred_dataset_dir):
-            for file in tqdm(files, desc=f"Processing {dataset_name}"):
-                if not file.endswith('.md'):
-                    continue
-                
-                pred_path = os.path.join(root, file)
-                rel_path = os.path.relpath(pred_path, start=pred_dataset_dir)
-                
-                category, subcategory = parse_category(rel_path)
-                if category != 'table': 
-                    continue
-
-                gt_path = os.path.join(args.gt_root, rel_path)
-                
-                pred_md = read_file(pred_path)
-                gt_md = read_file(gt_path)
-                
-                if gt_md is None or pred_md is None:
-                    continue
-                
-                pred_html = md_to_html(pred_md)
-                gt_html = md_to_html(gt_md)
-
-                try:
-                    score = teds_metric(pred_html, gt_html)
-                except Exception as e:
-                    print(f"\n[Skip] Error calculating {file}: {e}")
-                    # print(f"Bad HTML: {pred_html}") # 调试用
-                    score = 0.0
-
-                records.append({
-                    'dataset': dataset_name, 
-                    'cat': category, 
-                    'sub': subcategory,
-                    'teds': score
-                })
+
+        for row in tqdm(gt_rows, desc=f"Processing {dataset_name}"):
+            pred_md = read_file(os.path.join(pred_dataset_dir, row['rel_path']))
+            gt_md = read_file(row['path'])
+
+            if gt_md is None or pred_md is None:
+                continue
+
+            pred_html = md_to_html(pred_md)
+            gt_html = md_to_html(gt_md)
+
+            try:
+                score = teds_metric(pred_html, gt_html)
+            except Exception as e:
+                print(f"\n[Skip] Error calculating {os.path.basename(row['path'])}: {e}")
+                # print(f"Bad HTML: {pred_html}") # 调试用
+                score = 0.0
+
+            records.append({
+                'dataset': dataset_name,
+                'cat': row['category'],
+                'sub': row['subcategory'],
+                'teds': score
+            })
 
     if not records:
         print("No table files evaluated.")
@@ -0,0 +1,257 @@
+import json
+import time
+import uuid
+import argparse
+import threading
+import collections
+import email.parser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+MOCK_CONTENT = "# Mock Reconstruction\n\nThis is a mock answer from a local OpenAI-compatible server.\n"
+MOCK_REASONING = "Looking at the fragments and ordering them by their torn edges."
+
+def get_args():
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible mock server for load-testing the inference clients")
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='Bind address')
+    parser.add_argument('--port', type=int, default=8000, help='Port; clients use --base_url http://HOST:PORT/v1')
+    parser.add_argument('--ttft', type=float, default=0.5, help='Seconds before the first streamed token')
+    parser.add_argument('--chunks', type=int, default=20, help='Number of content chunks per streamed answer')
+    parser.add_argument('--chunk_delay', type=float, default=0.02, help='Seconds between streamed chunks')
+    parser.add_argument('--rpm_limit', type=int, default=None, help='Answer 429 with Retry-After once this many requests arrived in the last minute')
+    parser.add_argument('--batch_delay', type=float, default=2.0, help='Seconds a submitted batch stays in validating/in_progress before it completes')
+    return parser.parse_args()
+
+def continuation(messages):
+    """Rest of the mock answer after an assistant prefix sent in partial mode."""
+    last = messages[-1] if messages else {}
+    if last.get("role") == "assistant" and last.get("partial"):
+        prefix = last.get("content") or ""
+        return MOCK_CONTENT[len(prefix):] if MOCK_CONTENT.startswith(prefix) else MOCK_CONTENT
+    return MOCK_CONTENT
+
+def split_chunks(text, n):
+    step = max(1, -(-len(text) // max(1, n)))
+    return [text[i:i + step] for i in range(0, len(text), step)]
+
+def completion_body(request, completion_id=None):
+    content = continuation(request.get("messages") or [])
+    usage = {"prompt_tokens": 1000, "completion_tokens": len(content) // 4, "total_tokens": 1000 + len(content) // 4}
+    return {
+        "id": completion_id or f"chatcmpl-{uuid.uuid4().hex[:12]}", "object": "chat.completion",
+        "created": int(time.time()), "model": request.get("model", "mock-model"),
+        "choices": [{"index": 0, "finish_reason": "stop",
+                     "message": {"role": "assistant", "content": content, "reasoning_content": MOCK_REASONING}}],
+        "usage": usage,
+    }
+
+def to_jsonl(rows):
+    return "".join(json.dumps(row) + "\n" for row in rows).encode("utf-8")
+
+class BatchStore:
+    """In-memory Files + Batches API: a batch runs every line of its input file through the mock completion."""
+    def __init__(self, delay):
+        self.delay = delay
+        self.files = {}
+        self.batches = {}
+        self.lock = threading.Lock()
+
+    def add_file(self, data, filename, purpose):
+        file_id = f"file-{uuid.uuid4().hex[:12]}"
+        with self.lock:
+            self.files[file_id] = {"data": data, "meta": {
+                "id": file_id, "object": "file", "bytes": len(data), "created_at": int(time.time()),
+                "filename": filename, "purpose": purpose, "status": "processed",
+            }}
+        return self.files[file_id]["meta"]
+
+    def create_batch(self, request):
+        batch_id = f"batch_{uuid.uuid4().hex[:12]}"
+        batch = {
+            "id": batch_id, "object": "batch", "endpoint": request.get("endpoint"), "errors": None,
+            "input_file_id": request.get("input_file_id"), "completion_window": request.get("completion_window", "24h"),
+            "status": "validating", "output_file_id": None, "error_file_id": None, "created_at": int(time.time()),
+            "request_counts": {"total": 0, "completed": 0, "failed": 0}, "metadata": request.get("metadata"),
+        }
+        with self.lock:
+            self.batches[batch_id] = batch
+        threading.Thread(target=self._run, args=(batch,), daemon=True).start()
+        return batch
+
+    def _run(self, batch):
+        time.sleep(self.delay / 2)
+        source = self.files.get(batch["input_file_id"])
+        if source is None:
+            batch.update({"status": "failed", "errors": {"object": "list", "data": [{"message": "input file not found"}]}})
+            return
+        lines = [json.loads(line) for line in source["data"].splitlines() if line.strip()]
+        batch.update({"status": "in_progress", "request_counts": {"total": len(lines), "completed": 0, "failed": 0}})
+        time.sleep(self.delay / 2)
+        outputs, errors = [], []
+        for line in lines:
+            body = line.get("body") or {}
+            result = {"id": f"batch_req_{uuid.uuid4().hex[:12]}", "custom_id": line.get("custom_id")}
+            if not body.get("messages"):
+                result.update({"response": {"status_code": 400, "request_id": uuid.uuid4().hex,
+                                            "body": {"error": {"message": "messages is required"}}}, "error": None})
+                errors.append(result)
+                batch["request_counts"]["failed"] += 1
+            else:
+                result.update({"response": {"status_code": 200, "request_id": uuid.uuid4().hex,
+                                            "body": completion_body(body)}, "error": None})
+                outputs.append(result)
+                batch["request_counts"]["completed"] += 1
+        if outputs:
+            batch["output_file_id"] = self.add_file(to_jsonl(outputs), "batch_output.jsonl", "batch_output")["id"]
+        if errors:
+            batch["error_file_id"] = self.add_file(to_jsonl(errors), "batch_errors.jsonl", "batch_output")["id"]
+        batch.update({"status": "completed", "completed_at": int(time.time())})
+
+class SlidingWindow:
+    def __init__(self, limit, window=60.0):
+        self.limit = limit
+        self.window = window
+        self.arrivals = collections.deque()
+        self.lock = threading.Lock()
+
+    def admit(self):
+        """Return None if the request is admitted, else seconds until a slot frees."""
+        with self.lock:
+            now = time.monotonic()
+            while self.arrivals and now - self.arrivals[0] >= self.window:
+                self.arrivals.popleft()
+            if len(self.arrivals) >= self.limit:
+                return self.window - (now - self.arrivals[0])
+            self.arrivals.append(now)
+            return None
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    config = None
+    window = None
+    store = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _send_bytes(self, data):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_multipart(self):
+        length = int(self.headers.get("Content-Length", 0))
+        raw = f"Content-Type: {self.headers.get('Content-Type')}\r\n\r\n".encode('utf-8') + self.rfile.read(length)
+        fields, filename = {}, None
+        for part in email.parser.BytesParser().parsebytes(raw).get_payload():
+            name = part.get_param("name", header="content-disposition")
+            fields[name] = part.get_payload(decode=True)
+            filename = part.get_filename() or filename
+        return fields, filename
+
+    def do_GET(self):
+        parts = self.path.split("?")[0].strip("/").split("/")
+        if parts[-1] == "models":
+            self._send_json(200, {"object": "list", "data": [{"id": "mock-model", "object": "model", "owned_by": "mock"}]})
+        elif len(parts) >= 3 and parts[-3] == "files" and parts[-1] == "content" and parts[-2] in self.store.files:
+            self._send_bytes(self.store.files[parts[-2]]["data"])
+        elif len(parts) >= 2 and parts[-2] == "files" and parts[-1] in self.store.files:
+            self._send_json(200, self.store.files[parts[-1]]["meta"])
+        elif len(parts) >= 2 and parts[-2] == "batches" and parts[-1] in self.store.batches:
+            self._send_json(200, self.store.batches[parts[-1]])
+        else:
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+    def do_POST(self):
+        path = self.path.split("?")[0].rstrip("/")
+        if path.endswith("/files"):
+            fields, filename = self._read_multipart()
+            purpose = (fields.get("purpose") or b"batch").decode('utf-8')
+            self._send_json(200, self.store.add_file(fields.get("file") or b"", filename or "upload.jsonl", purpose))
+            return
+        if path.endswith("/batches"):
+            self._send_json(200, self.store.create_batch(self._read_json()))
+            return
+        if not path.endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+            return
+        request = self._read_json()
+        if self.window is not None:
+            retry_after = self.window.admit()
+            if retry_after is not None:
+                self.server.rejected += 1
+                self._send_json(429, {"error": {"message": "Rate limit exceeded", "type": "rate_limit_error"}},
+                                {"Retry-After": f"{retry_after:.2f}"})
+                return
+        self.server.accepted += 1
+        model = request.get("model", "mock-model")
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        completion = completion_body(request, completion_id)
+        content, usage = completion["choices"][0]["message"]["content"], completion["usage"]
+        time.sleep(self.config.ttft)
+
+        if not request.get("stream"):
+            self._send_json(200, completion)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def send_event(data):
+            payload = f"data: {data}\n\n".encode('utf-8')
+            self.wfile.write(f"{len(payload):X}\r\n".encode('ascii') + payload + b"\r\n")
+            self.wfile.flush()
+
+        def chunk(delta, finish_reason=None):
+            return json.dumps({
+                "id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            })
+
+        send_event(chunk({"role": "assistant", "reasoning_content": MOCK_REASONING}))
+        for piece in split_chunks(content, self.config.chunks):
+            send_event(chunk({"content": piece}))
+            time.sleep(self.config.chunk_delay)
+        send_event(chunk({}, finish_reason="stop"))
+        if (request.get("stream_options") or {}).get("include_usage"):
+            send_event(json.dumps({"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                                   "model": model, "choices": [], "usage": usage}))
+        send_event("[DONE]")
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+def main():
+    args = get_args()
+    MockHandler.config = args
+    MockHandler.window = SlidingWindow(args.rpm_limit) if args.rpm_limit else None
+    MockHandler.store = BatchStore(args.batch_delay)
+    server = ThreadingHTTPServer((args.host, args.port), MockHandler)
+    server.daemon_threads = True
+    server.accepted, server.rejected = 0, 0
+    print(f"Mock OpenAI server on http://{args.host}:{args.port}/v1 (ttft {args.ttft}s, {args.chunks} chunks, RPM limit {args.rpm_limit or 'none'}, batch delay {args.batch_delay}s)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print(f"\nAccepted {server.accepted} | Rejected (429) {server.rejected}")
+
+if __name__ == "__main__":
+    main()
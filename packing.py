@@ -0,0 +1,196 @@
+import os
+import sys
+import json
+import math
+import zlib
+import random
+import argparse
+import concurrent.futures
+import numpy as np
+from PIL import Image
+from scipy import ndimage, signal
+
+import fragment_store
+
+SOURCE_ROOT_DIR = os.path.abspath("news_textures_output")
+LAYOUT_MANIFEST = "layout.json"
+PIXELS_PER_METER = 500.0
+PACKING_DOWNSAMPLE = 0.1
+PACKING_PADDING = 30
+
+def get_args():
+    parser = argparse.ArgumentParser(description="Precompute per-document fragment layouts outside Blender")
+    parser.add_argument('--source_root', type=str, default=SOURCE_ROOT_DIR, help='Root directory of group_N_pieces/<doc> folders')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Number of layout worker processes')
+    parser.add_argument('--seed', type=int, default=None, help='Base seed; each document is seeded from it and its name')
+    parser.add_argument('--overwrite', action='store_true', help=f'Recompute documents that already have {LAYOUT_MANIFEST}')
+    return parser.parse_args()
+
+def find_document_folders(source_root):
+    """Return sorted (folder_path, name) pairs; name is the path relative to source_root."""
+    tasks = []
+    for root, dirs, files in os.walk(source_root):
+        if fragment_store.has_fragments(files):
+            name = os.path.relpath(root, source_root).replace("\\", "/")
+            tasks.append((root, name))
+    tasks.sort(key=lambda x: x[1])
+    return tasks
+
+def compute_signed_distance(arr):
+    """Euclidean signed distance to the mask edge: <= 0 inside, > 0 outside."""
+    if not arr.any():
+        return np.full(arr.shape, np.inf)
+    return ndimage.distance_transform_edt(~arr) - ndimage.distance_transform_edt(arr)
+
+def load_and_process_mask_for_packing(mask, downsample_factor, padding_px, rng=random):
+    img = mask if isinstance(mask, Image.Image) else Image.open(mask).convert('L')
+    angle = rng.uniform(0, 360)
+    img_rot = img.rotate(angle, expand=True, resample=Image.BICUBIC)
+    w, h = img_rot.size
+    new_w = int(w * downsample_factor)
+    new_h = int(h * downsample_factor)
+    img_small = img_rot.resize((new_w, new_h), Image.NEAREST)
+    arr = np.array(img_small) > 128
+
+    # 四周先留出 pad_r 的空白，避免膨胀被边界截断
+    pad_r = int(padding_px * downsample_factor)
+    arr = np.pad(arr, pad_r)
+    sdf = compute_signed_distance(arr)
+    arr_padded = sdf <= pad_r
+    return arr_padded, angle, (w, h), sdf
+
+def find_best_placement(canvas, mask_arr):
+    """
+    Return the collision-free (x, y) offset whose piece centre is nearest the
+    canvas centre, or None. Overlap for every offset at once comes from one
+    FFT correlation of the occupancy canvas with the piece mask.
+    """
+    c_h, c_w = canvas.shape
+    p_h, p_w = mask_arr.shape
+    if p_h > c_h or p_w > c_w:
+        return None
+    if canvas.any():
+        overlap = signal.fftconvolve(canvas.astype(np.float64), mask_arr[::-1, ::-1].astype(np.float64), mode='valid')
+        feasible = overlap < 0.5
+    else:
+        feasible = np.ones((c_h - p_h + 1, c_w - p_w + 1), dtype=bool)
+    if not feasible.any():
+        return None
+
+    ys = np.arange(feasible.shape[0])[:, None] + p_h / 2 - c_h // 2
+    xs = np.arange(feasible.shape[1])[None, :] + p_w / 2 - c_w // 2
+    dist_sq = np.where(feasible, ys ** 2 + xs ** 2, np.inf)
+    best_y, best_x = np.unravel_index(np.argmin(dist_sq), dist_sq.shape)
+    return int(best_x), int(best_y)
+
+def compute_layout(folder_path, rng=random):
+    """
+    Pack every fragment of one document folder. Returns a list of dicts with
+    idx, mask/tex file names, rotation (radians) and world location (x, y, z).
+    """
+    pieces_data = []
+    total_mask_area = 0
+    for idx, mask_img in fragment_store.iter_masks(folder_path):
+        mask_arr_padded, angle_deg, rot_size_px, sdf = load_and_process_mask_for_packing(
+            mask_img, PACKING_DOWNSAMPLE, PACKING_PADDING, rng
+        )
+        area = np.sum(mask_arr_padded)
+        total_mask_area += area
+        pieces_data.append({
+            'idx': idx, 'mask_file': f"mask_{idx}.png", 'mask_arr': mask_arr_padded, 'sdf': sdf,
+            'angle': math.radians(angle_deg), 'area': area, 'rot_size_px': rot_size_px
+        })
+    if not pieces_data:
+        return []
+    pieces_data.sort(key=lambda x: x['area'], reverse=True)
+    estimated_side = int(math.sqrt(total_mask_area / 0.5))
+    canvas_side = int(estimated_side * 1.5)
+    max_piece_dim = max([max(p['mask_arr'].shape) for p in pieces_data])
+    canvas_side = max(canvas_side, max_piece_dim * 2)
+    canvas = np.zeros((canvas_side, canvas_side), dtype=bool)
+    layout = []
+    pad_r = int(PACKING_PADDING * PACKING_DOWNSAMPLE)
+
+    for p in pieces_data:
+        mask_arr = p['mask_arr']
+        p_h, p_w = mask_arr.shape
+        placement = find_best_placement(canvas, mask_arr)
+        # 放不下时复用距离场逐步收紧间距，而不是直接丢弃碎片
+        for relaxed_r in (pad_r / 2, 0):
+            if placement is not None or relaxed_r >= pad_r: break
+            mask_arr = p['sdf'] <= relaxed_r
+            placement = find_best_placement(canvas, mask_arr)
+        if placement is None:
+            print(f"⚠️ 碎片 {p['idx']} 无处可放，已跳过")
+            continue
+        best_x, best_y = placement
+
+        canvas[best_y:best_y+p_h, best_x:best_x+p_w] |= mask_arr
+        orig_x_px = (best_x + pad_r) / PACKING_DOWNSAMPLE
+        orig_y_px = (best_y + pad_r) / PACKING_DOWNSAMPLE
+        rot_w_px, rot_h_px = p['rot_size_px']
+        world_left = orig_x_px / PIXELS_PER_METER
+        world_top = -orig_y_px / PIXELS_PER_METER
+        center_obj_x = world_left + (rot_w_px / PIXELS_PER_METER) / 2.0
+        center_obj_y = world_top - (rot_h_px / PIXELS_PER_METER) / 2.0
+        center_obj_z = rng.uniform(0.01, 0.05)
+
+        layout.append({
+            'idx': p['idx'],
+            'mask_file': p['mask_file'],
+            'tex_file': f"tex_{p['idx']}.png",
+            'rotation': p['angle'],
+            'location': [center_obj_x, center_obj_y, center_obj_z],
+        })
+    return layout
+
+def load_layout(folder_path):
+    manifest_path = os.path.join(folder_path, LAYOUT_MANIFEST)
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        return json.load(f)['pieces']
+
+def save_layout(folder_path, layout):
+    # 先写临时文件再原子替换，避免 Blender 读到半个 JSON
+    manifest_path = os.path.join(folder_path, LAYOUT_MANIFEST)
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'pieces': layout}, f, indent=2)
+    os.replace(tmp_path, manifest_path)
+
+def document_rng(name, seed=None):
+    if seed is None:
+        return random.Random()
+    return random.Random((seed + zlib.crc32(name.encode('utf-8'))) % (2 ** 32))
+
+def layout_worker(task):
+    folder_path, name, seed = task
+    try:
+        layout = compute_layout(folder_path, document_rng(name, seed))
+        save_layout(folder_path, layout)
+        return f"[Done] {name} ({len(layout)} pieces)"
+    except Exception as e:
+        return f"[Fail] {name}: {e}"
+
+def main():
+    args = get_args()
+    if not os.path.exists(args.source_root):
+        print(f"Directory {args.source_root} not found.")
+        sys.exit(1)
+
+    tasks = []
+    skipped_count = 0
+    for folder_path, name in find_document_folders(args.source_root):
+        if not args.overwrite and os.path.exists(os.path.join(folder_path, LAYOUT_MANIFEST)):
+            skipped_count += 1
+            continue
+        tasks.append((folder_path, name, args.seed))
+
+    print(f"Layouts to compute: {len(tasks)} | Skipped (already done): {skipped_count} | Workers: {max(1, args.workers)}")
+    with concurrent.futures.ProcessPoolExecutor(max_workers=max(1, args.workers)) as executor:
+        for i, result in enumerate(executor.map(layout_worker, tasks, chunksize=4)):
+            print(f"[{i+1}/{len(tasks)}] {result}")
+
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,85 @@
 import os
-import time
+import shutil
+import argparse
 import tempfile
 import re
+import zlib
+import concurrent.futures
 import numpy as np
 import markdown
 import uuid  
+from io import BytesIO
 from PIL import Image
+from scipy import ndimage
 from scipy.spatial import cKDTree
 
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
 
+import fragment_store
+
 MDS_DIR = "./my_dataset/code/python"               
 ROOT_OUTPUT_DIR = "news_textures_output"
-FIXED_PIECE_COUNT = 16       
+PIECE_COUNTS = [8, 12, 16]
 RENDER_WIDTH = 1600      
 FONT_SIZE_PX = 28        
 MIN_HEIGHT = 1000        
 CHROME_BINARY_PATH = os.path.abspath("./chrome_bin/chrome-linux64/chrome")
 DRIVER_PATH = os.path.abspath("./chrome_bin/chromedriver-linux64/chromedriver")
+MATHJAX_CDN_URL = "https://cdn.bootcdn.net/ajax/libs/mathjax/3.2.2/es5/tex-svg.js"
+MATHJAX_LOCAL_PATH = os.path.abspath("./mathjax/es5/tex-svg.js")
+MATHJAX_TIMEOUT = 5.0
+NOISE_ATLAS_SIZE = 512
+NOISE_BAND_ROWS = 512
+
+# MathJax 排版完成（或脚本加载失败）时回调，替代固定间隔轮询
+WAIT_FOR_RENDER_JS = """
+const done = arguments[arguments.length - 1];
+const finished = () => document.body.hasAttribute('data-render-status');
+if (finished()) { done(document.body.getAttribute('data-render-status')); return; }
+new MutationObserver((_, observer) => {
+    if (finished()) {
+        observer.disconnect();
+        done(document.body.getAttribute('data-render-status'));
+    }
+}).observe(document.body, { attributes: true, attributeFilter: ['data-render-status'] });
+"""
 
-def get_standard_html(html_content):
+def resolve_mathjax_src(local_path=MATHJAX_LOCAL_PATH):
+    if local_path and os.path.exists(local_path):
+        return "file://" + os.path.abspath(local_path).replace("\\", "/")
+    return MATHJAX_CDN_URL
+
+def get_mathjax_block(mathjax_src):
+    return f"""
+    <script>
+    MathJax = {{
+      tex: {{ 
+          inlineMath: [['$', '$'], ['\\\\(', '\\\\)']],
+          displayMath: [['$$', '$$'], ['\\\\[', '\\\\]']],
+          processEscapes: true,
+          tags: 'ams' 
+      }},
+      svg: {{ fontCache: 'global' }},
+      startup: {{
+        pageReady: () => {{
+           return MathJax.startup.defaultPageReady().then(() => {{
+             document.body.setAttribute('data-render-status', 'done');
+             const height = Math.max(document.body.scrollHeight, document.body.offsetHeight, {MIN_HEIGHT});
+             document.body.setAttribute('data-height', height);
+           }});
+        }}
+      }}
+    }};
+    </script>
+    <script type="text/javascript" id="MathJax-script" async
+      src="{mathjax_src}"
+      onerror="document.body.setAttribute('data-render-status', 'error')">
+    </script>"""
+
+def get_standard_html(html_content, mathjax_src=None):
+    mathjax_block = get_mathjax_block(mathjax_src) if mathjax_src else ""
     return f"""
     <!DOCTYPE html>
     <html>
@@ -53,29 +111,7 @@ def get_standard_html(html_content):
         th {{ background-color: #eee; font-weight: bold; }}
         mjx-container {{ font-size: 110% !important; outline: none !important; }}
     </style>
-    <script>
-    MathJax = {{
-      tex: {{ 
-          inlineMath: [['$', '$'], ['\\\\(', '\\\\)']],
-          displayMath: [['$$', '$$'], ['\\\\[', '\\\\]']],
-          processEscapes: true,
-          tags: 'ams' 
-      }},
-      svg: {{ fontCache: 'global' }},
-      startup: {{
-        pageReady: () => {{
-           return MathJax.startup.defaultPageReady().then(() => {{
-             document.body.setAttribute('data-render-status', 'done');
-             const height = Math.max(document.body.scrollHeight, document.body.offsetHeight, {MIN_HEIGHT});
-             document.body.setAttribute('data-height', height);
-           }});
-        }}
-      }}
-    }};
-    </script>
-    <script type="text/javascript" id="MathJax-script" async
-      src="https://cdn.bootcdn.net/ajax/libs/mathjax/3.2.2/es5/tex-svg.js">
-    </script>
+    {mathjax_block}
     </head>
     <body>
         {html_content}
@@ -83,6 +119,19 @@ def get_standard_html(html_content):
     </html>
     """
 
+def get_args():
+    parser = argparse.ArgumentParser(description="Render markdown documents and cut them into Voronoi fragments")
+    parser.add_argument('--mds_dir', type=str, default=MDS_DIR, help='Directory of markdown documents')
+    parser.add_argument('--output_root', type=str, default=ROOT_OUTPUT_DIR, help='Root directory for group_N_pieces outputs')
+    parser.add_argument('--piece_counts', nargs='+', type=int, default=PIECE_COUNTS, help='Granularities cut from a single render (e.g. 8 12 16)')
+    parser.add_argument('--workers', type=int, default=1, help='Number of headless Chrome worker processes')
+    parser.add_argument('--pages_per_driver', type=int, default=50, help='Recycle each Chrome driver after this many documents')
+    parser.add_argument('--seed', type=int, default=None, help='Base seed; each document is seeded from it and its name')
+    parser.add_argument('--save_base', action='store_true', help='Also write the full-page texture_base.png for each document')
+    parser.add_argument('--formats', nargs='+', choices=['png', 'atlas', 'fragments'], default=['png'], help='Fragment outputs: png = mask_i/tex_i.png pairs, atlas = one RGBA atlas.png + atlas.json, fragments = memory-mappable fragments.bin + fragments.json per document')
+    parser.add_argument('--mathjax_path', type=str, default=MATHJAX_LOCAL_PATH, help='Local tex-svg.js for offline rendering (falls back to CDN if missing)')
+    return parser.parse_args()
+
 def init_driver():
     if not os.path.exists(CHROME_BINARY_PATH):
         raise FileNotFoundError(f"❌ 找不到 Chrome: {CHROME_BINARY_PATH}")
@@ -96,7 +145,7 @@ def init_driver():
     service = Service(executable_path=DRIVER_PATH)
     return webdriver.Chrome(service=service, options=chrome_options)
 
-def render_markdown_to_long_image(driver, md_text, output_path):
+def render_markdown_to_long_image(driver, md_text, output_path=None, mathjax_src=MATHJAX_CDN_URL, noise_atlas=None):
     if "\\n" in md_text or (md_text.strip().startswith('"') and md_text.strip().endswith('"')):
         cleaned_text = md_text.strip()
         if cleaned_text.startswith('"') and cleaned_text.endswith('"'):
@@ -131,7 +180,8 @@ def render_markdown_to_long_image(driver, md_text, output_path):
     if not abs_mds_path.endswith("/"):
         abs_mds_path += "/"
         
-    full_html = get_standard_html(html_body).replace(
+    # 没有公式占位符的文档完全不加载 MathJax
+    full_html = get_standard_html(html_body, mathjax_src if placeholders else None).replace(
         "<head>", 
         f'<head><base href="file://{abs_mds_path}">'
     )
@@ -142,118 +192,254 @@ def render_markdown_to_long_image(driver, md_text, output_path):
 
     try:
         driver.get(f"file:///{temp_path}")
-        try:
-            start_t = time.time()
-            while time.time() - start_t < 5.0:
-                status = driver.execute_script("return document.body.getAttribute('data-render-status');")
-                if status == 'done':
-                    break
-                time.sleep(0.2)
-        except:
-            pass
-        required_height = driver.execute_script("return document.body.getAttribute('data-height') || document.body.scrollHeight")
+        if placeholders:
+            try:
+                driver.set_script_timeout(MATHJAX_TIMEOUT)
+                driver.execute_async_script(WAIT_FOR_RENDER_JS)
+            except:
+                pass
+        required_height = driver.execute_script(
+            f"return document.body.getAttribute('data-height') || "
+            f"Math.max(document.body.scrollHeight, document.body.offsetHeight, {MIN_HEIGHT})"
+        )
         required_height = int(float(required_height)) + 100 
         
         driver.set_window_size(RENDER_WIDTH, required_height)
-        driver.save_screenshot(output_path)
+        png_bytes = driver.get_screenshot_as_png()
         
     finally:
         try: os.remove(temp_path)
         except: pass
 
-    apply_paper_texture(output_path)
+    # 截图只解码一次，之后全程以 uint8 数组在内存中传递
+    with Image.open(BytesIO(png_bytes)) as shot:
+        img_arr = np.asarray(shot.convert("RGBA") if shot.mode not in ("RGB", "RGBA") else shot)
+    if noise_atlas is None:
+        noise_atlas = build_noise_atlas()
+    img_arr = apply_paper_texture(img_arr, noise_atlas)
+    if output_path:
+        Image.fromarray(img_arr).save(output_path)
+    return img_arr
+
+def build_noise_atlas(seed=None, size=NOISE_ATLAS_SIZE):
+    # i.i.d. 噪声天然可平铺，每次运行只生成一次
+    rng = np.random.default_rng(seed)
+    return rng.integers(240, 255, (size, size, 3), dtype=np.uint8)
+
+def apply_paper_texture(img_arr, noise_atlas):
+    """Composite the page over the tiled noise atlas; returns an RGB uint8 array."""
+    rgb = np.ascontiguousarray(img_arr[..., :3])
+    if img_arr.shape[2] < 4:
+        return rgb
+    alpha = img_arr[..., 3]
+    if alpha.min() == 255:
+        return rgb
 
-def apply_paper_texture(image_path):
     try:
-        img = Image.open(image_path).convert("RGBA")
-        noise = np.random.randint(240, 255, (img.height, img.width, 3), dtype=np.uint8)
-        bg = Image.fromarray(noise, mode="RGB").convert("RGBA")
-        final = Image.alpha_composite(bg, img)
-        final.convert("RGB").save(image_path)
+        # 每个文档随机偏移图集，避免所有页面纹理完全相同
+        size = noise_atlas.shape[0]
+        oy, ox = np.random.randint(0, size, 2)
+        atlas = np.roll(noise_atlas, (oy, ox), axis=(0, 1))
+        h, w = alpha.shape
+        reps_x = -(-w // size)
+        strip = np.tile(atlas, (1, reps_x, 1))[:, :w]
+
+        # 按行带原地混合，只处理非不透明像素，峰值内存与带高成正比
+        for y0 in range(0, h, NOISE_BAND_ROWS):
+            y1 = min(h, y0 + NOISE_BAND_ROWS)
+            a_band = alpha[y0:y1]
+            sel = a_band < 255
+            if not sel.any(): continue
+            rows = (np.arange(y0, y1) % size)[:, None]
+            noise = strip[rows, np.arange(w)[None, :]][sel].astype(np.uint16)
+            a = a_band[sel][:, None].astype(np.uint16)
+            band = rgb[y0:y1]
+            band[sel] = ((band[sel] * a + noise * (255 - a) + 127) // 255).astype(np.uint8)
     except Exception as e:
         print(f"Texture error: {e}")
+    return rgb
 
-def generate_cut_masks(base_img_path, output_dir, num_pieces):
-    try:
-        img = Image.open(base_img_path)
-    except FileNotFoundError:
-        print(f"Skipping {base_img_path}, not found.")
-        return
+def _nearest_index_map(src_len, dst_len):
+    # 直接向 PIL 取 NEAREST 缩放的采样索引表，保证与整图 resize 逐字节一致
+    ramp = np.arange(src_len, dtype=np.int32)[None, :]
+    return np.array(Image.fromarray(ramp).resize((dst_len, 1), resample=Image.NEAREST))[0]
 
-    w, h = img.size
+def compute_voronoi_regions(w, h, num_pieces, scale=0.5):
     points = np.random.rand(num_pieces, 2) * [w, h]
-    
-    scale = 0.5 
+
     small_w, small_h = int(w * scale), int(h * scale)
     y_grid, x_grid = np.indices((small_h, small_w))
     coords = np.stack((x_grid, y_grid), axis=-1).reshape(-1, 2)
-    
+
     tree = cKDTree(points * scale)
-    _, regions = tree.query(coords)
-    regions = regions.reshape(small_h, small_w)
-    
+    _, regions = tree.query(coords, workers=-1)
+    return regions.reshape(small_h, small_w)
+
+def iter_cut_pieces(w, h, num_pieces, pad=2):
+    """
+    Label the low-res Voronoi map once and yield (idx, box, mask_crop) per piece.
+    Bounding boxes come from a single find_objects pass; only each piece's
+    low-res crop is upscaled, so cost no longer grows with pieces x pixels.
+    """
+    regions = compute_voronoi_regions(w, h, num_pieces)
+    small_h, small_w = regions.shape
+    x_map = _nearest_index_map(small_w, w)
+    y_map = _nearest_index_map(small_h, h)
+
+    slices = ndimage.find_objects(regions + 1, max_label=num_pieces)
+    for i, sl in enumerate(slices):
+        if sl is None: continue
+        sy, sx = sl
+        y_min, y_end = np.searchsorted(y_map, [sy.start, sy.stop])
+        x_min, x_end = np.searchsorted(x_map, [sx.start, sx.stop])
+        if y_end <= y_min or x_end <= x_min: continue
+
+        y_min, y_max = max(0, y_min - pad), min(h, y_end - 1 + pad)
+        x_min, x_max = max(0, x_min - pad), min(w, x_end - 1 + pad)
+
+        rows = y_map[y_min:y_max]
+        cols = x_map[x_min:x_max]
+        small_crop = regions[rows[0]:rows[-1] + 1, cols[0]:cols[-1] + 1]
+        upscaled = small_crop[(rows - rows[0])[:, None], (cols - cols[0])[None, :]]
+        mask_crop = (upscaled == i).astype(np.uint8) * 255
+        yield i, (x_min, y_min, x_max, y_max), mask_crop
+
+def generate_cut_masks(base_img, output_dir, num_pieces, formats=('png',)):
+    if isinstance(base_img, np.ndarray):
+        img_arr = base_img
+    elif isinstance(base_img, Image.Image):
+        img_arr = np.asarray(base_img)
+    else:
+        try:
+            with Image.open(base_img) as img:
+                img_arr = np.asarray(img)
+        except FileNotFoundError:
+            print(f"Skipping {base_img}, not found.")
+            return
+
+    h, w = img_arr.shape[:2]
     os.makedirs(output_dir, exist_ok=True)
-    
-    for i in range(num_pieces):
-        small_mask = (regions == i).astype(np.uint8) * 255
-        mask_img = Image.fromarray(small_mask).resize((w, h), resample=Image.NEAREST)
-        mask_arr = np.array(mask_img)
-        
-        rows, cols = np.where(mask_arr > 0)
-        if len(rows) == 0: continue
-        
-        y_min, y_max = rows.min(), rows.max()
-        x_min, x_max = cols.min(), cols.max()
-        
-        pad = 2
-        y_min, y_max = max(0, y_min - pad), min(h, y_max + pad)
-        x_min, x_max = max(0, x_min - pad), min(w, x_max + pad)
 
-        mask_crop = mask_arr[y_min:y_max, x_min:x_max]
-        tex_crop = img.crop((x_min, y_min, x_max, y_max))
+    pieces = []
+    for i, (x_min, y_min, x_max, y_max), mask_crop in iter_cut_pieces(w, h, num_pieces):
+        tex_crop = img_arr[y_min:y_max, x_min:x_max]
+
+        if 'png' in formats:
+            Image.fromarray(mask_crop).save(os.path.join(output_dir, f"mask_{i}.png"))
+            Image.fromarray(tex_crop).save(os.path.join(output_dir, f"tex_{i}.png"))
+        if 'atlas' in formats or 'fragments' in formats:
+            pieces.append((i, (x_min, y_min, x_max, y_max), mask_crop, tex_crop))
 
-        Image.fromarray(mask_crop).save(os.path.join(output_dir, f"mask_{i}.png"))
-        tex_crop.save(os.path.join(output_dir, f"tex_{i}.png"))
+    if pieces and 'atlas' in formats:
+        fragment_store.write_atlas(output_dir, pieces)
+    if pieces and 'fragments' in formats:
+        fragment_store.write_fragments(output_dir, pieces)
+
+def process_document(driver, file_path, doc_output_dirs, pending, mathjax_src, noise_atlas, save_base=False, formats=('png',)):
+    with open(file_path, 'r', encoding='utf-8') as f:
+        content = f.read()
+
+    # 每个文档只渲染一次，同一张底图切出所有粒度
+    full_img_path = os.path.join(doc_output_dirs[pending[0]], "texture_base.png") if save_base else None
+    img_arr = render_markdown_to_long_image(driver, content, full_img_path, mathjax_src, noise_atlas)
+    if save_base:
+        for n in pending[1:]:
+            shutil.copyfile(full_img_path, os.path.join(doc_output_dirs[n], "texture_base.png"))
+
+    for n in pending:
+        generate_cut_masks(img_arr, doc_output_dirs[n], n, formats)
+
+def render_shard(worker_id, shard, output_root, piece_counts, pages_per_driver, seed, mathjax_src, save_base, formats=('png',)):
+    """
+    Render one shard of documents with a private Chrome driver.
+    The driver is recycled every `pages_per_driver` documents and after any
+    failure, so one bad page never takes the rest of the shard down with it.
+    """
+    if seed is None:
+        np.random.seed()
+    noise_atlas = build_noise_atlas(seed)
+    driver = None
+    pages_on_driver = 0
+    done, skipped, failed = 0, 0, []
+
+    for total_idx, total, file_path in shard:
+        filename = os.path.basename(file_path)
+        item_name = os.path.splitext(filename)[0]
+        doc_output_dirs = {
+            n: os.path.join(output_root, f"group_{n}_pieces", item_name) for n in piece_counts
+        }
+        pending = [n for n in piece_counts if not os.path.exists(doc_output_dirs[n])]
+        if not pending:
+            print(f"⏭️ [W{worker_id}] [{total_idx}/{total}] 跳过: {filename} (目录已存在)")
+            skipped += 1
+            continue
+
+        try:
+            if driver is not None and pages_on_driver >= pages_per_driver:
+                driver.quit()
+                driver = None
+            if driver is None:
+                driver = init_driver()
+                pages_on_driver = 0
+
+            for n in pending:
+                os.makedirs(doc_output_dirs[n], exist_ok=True)
+            if seed is not None:
+                np.random.seed((seed + zlib.crc32(item_name.encode('utf-8'))) % (2 ** 32))
+
+            print(f"[W{worker_id}] [{total_idx}/{total}] 渲染: {filename} -> {pending} 个碎片")
+            pages_on_driver += 1
+            process_document(driver, file_path, doc_output_dirs, pending, mathjax_src, noise_atlas, save_base, formats)
+            done += 1
+        except Exception as e:
+            print(f"❌ [W{worker_id}] Error: {filename}: {e}")
+            failed.append(filename)
+            # 清理半成品目录，下次运行可以重试；驱动也一并重建
+            for n in pending:
+                shutil.rmtree(doc_output_dirs[n], ignore_errors=True)
+            if driver is not None:
+                try: driver.quit()
+                except: pass
+                driver = None
+
+    if driver is not None:
+        driver.quit()
+    return done, skipped, failed
 
 def main():
-    if not os.path.exists(MDS_DIR): 
-        print(f"Directory {MDS_DIR} not found.")
+    args = get_args()
+    if not os.path.exists(args.mds_dir): 
+        print(f"Directory {args.mds_dir} not found.")
         return
 
-    md_files = [f for f in os.listdir(MDS_DIR) if f.lower().endswith('.md')]
+    md_files = [f for f in os.listdir(args.mds_dir) if f.lower().endswith('.md')]
     md_files.sort()
-    
-    driver = init_driver()
-    
-    print(f"🚀 Blender 数据生成模式 | 处理 {len(md_files)} 个文件...")
+    piece_counts = sorted(set(args.piece_counts))
+    workers = max(1, min(args.workers, len(md_files)))
+    mathjax_src = resolve_mathjax_src(args.mathjax_path)
 
-    for i, filename in enumerate(md_files):
-        try:
-            file_path = os.path.join(MDS_DIR, filename)
-            item_name = os.path.splitext(filename)[0]
-            group_folder = f"group_{FIXED_PIECE_COUNT}_pieces"
-            doc_output_dir = os.path.join(ROOT_OUTPUT_DIR, group_folder, item_name)
-            if os.path.exists(doc_output_dir):
-                print(f"⏭️ [{i+1}/{len(md_files)}] 跳过: {filename} (目录已存在)")
-                continue
-            os.makedirs(doc_output_dir, exist_ok=True)
-            
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            full_img_path = os.path.join(doc_output_dir, "texture_base.png")
-            print(f"[{i+1}/{len(md_files)}] 渲染: {filename}")
-            
-            render_markdown_to_long_image(driver, content, full_img_path)
-            
-            print(f"    -> 生成 {FIXED_PIECE_COUNT} 个碎片纹理...")
-            generate_cut_masks(full_img_path, doc_output_dir, FIXED_PIECE_COUNT)
-            
-        except Exception as e:
-            print(f"❌ Error: {e}")
+    print(f"🚀 Blender 数据生成模式 | 处理 {len(md_files)} 个文件 | 粒度 {piece_counts} | {workers} 个 Chrome 进程...")
+    print(f"MathJax: {mathjax_src}")
+
+    indexed = [(i + 1, len(md_files), os.path.join(args.mds_dir, f)) for i, f in enumerate(md_files)]
+    shards = [indexed[k::workers] for k in range(workers)]
+    job_args = [(k, shards[k], args.output_root, piece_counts, args.pages_per_driver, args.seed, mathjax_src, args.save_base, args.formats) for k in range(workers)]
+
+    results = []
+    if workers == 1:
+        results.append(render_shard(*job_args[0]))
+    else:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(render_shard, *a) for a in job_args]
+            for future in concurrent.futures.as_completed(futures):
+                results.append(future.result())
 
-    driver.quit()
-    print("\n✅ 完成！")
+    done = sum(r[0] for r in results)
+    skipped = sum(r[1] for r in results)
+    failed = sorted(f for r in results for f in r[2])
+    print(f"\n✅ 完成！渲染 {done} | 跳过 {skipped} | 失败 {len(failed)}")
+    for filename in failed:
+        print(f"   ❌ {filename}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
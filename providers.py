@@ -0,0 +1,107 @@
+import os
+
+class Provider:
+    """
+    Connection defaults and request shape of one OpenAI-compatible
+    endpoint. Every model served by a provider shares its HTTP pool and
+    rate limits; subclasses override the class attributes and, where the
+    wire format differs, the request builders.
+    """
+    name = None
+    base_url = None
+    api_key_env = None
+    default_api_key = "EMPTY"
+    workers = 20
+    max_workers = None
+    rpm = None
+    tpm = None
+    timeout = 180.0
+    # 解码参数：原样放进请求体，同时参与响应缓存键
+    extra_body = {}
+    supports_batch = True
+    # 能否续写半截回答（断点续传）；为 True 的子类需实现 continue_prefix
+    supports_prefix = False
+
+    def __init__(self, **overrides):
+        self.api_key = None
+        for key, value in overrides.items():
+            if value is not None:
+                setattr(self, key, value)
+        if self.api_key is None:
+            self.api_key = os.environ.get(self.api_key_env, self.default_api_key) if self.api_key_env else self.default_api_key
+
+    def chat_request(self, model, messages, resume_prefix=""):
+        """Keyword arguments for a streaming chat.completions.create call."""
+        extra_body = dict(self.extra_body)
+        if resume_prefix:
+            messages, continuation = self.continue_prefix(messages, resume_prefix)
+            extra_body.update(continuation)
+        return {
+            "model": model,
+            "messages": messages,
+            "stream": True,
+            "stream_options": {"include_usage": True},
+            "extra_body": extra_body,
+        }
+
+    def batch_body(self, model, messages):
+        """Request body of one Batch API line (non-streaming)."""
+        return {"model": model, "messages": messages, **self.extra_body}
+
+    def cache_params(self):
+        return {'extra_body': self.extra_body}
+
+class DashScopeProvider(Provider):
+    name = "dashscope"
+    base_url = "https://dashscope.aliyuncs.com/compatible-mode/v1"
+    api_key_env = "DASHSCOPE_API_KEY"
+    default_api_key = "xxxxxx"
+    supports_prefix = True
+    extra_body = {
+        "enable_thinking": True,
+        # "thinking_budget": 4096 # Optional: Control thinking token budget
+    }
+
+    def continue_prefix(self, messages, prefix):
+        # DashScope 前缀续写：最后一条 assistant 消息带 "partial": true
+        return messages + [{"role": "assistant", "content": prefix, "partial": True}], {}
+
+class OpenAIProvider(Provider):
+    name = "openai"
+    base_url = "https://api.openai.com/v1"
+    api_key_env = "OPENAI_API_KEY"
+
+class VLLMProvider(Provider):
+    """Local vLLM (or SGLang) server: no quotas, so a wide pool; thinking is a chat-template switch."""
+    name = "vllm"
+    base_url = "http://localhost:8000/v1"
+    api_key_env = "VLLM_API_KEY"
+    workers = 64
+    max_workers = 256
+    timeout = 600.0
+    extra_body = {"chat_template_kwargs": {"enable_thinking": True}}
+    supports_batch = False
+    supports_prefix = True
+
+    def continue_prefix(self, messages, prefix):
+        return messages + [{"role": "assistant", "content": prefix}], {
+            "continue_final_message": True, "add_generation_prompt": False,
+        }
+
+class MockProvider(Provider):
+    """mock_openai_server.py on localhost, for load tests and dry runs."""
+    name = "mock"
+    base_url = "http://127.0.0.1:8000/v1"
+    default_api_key = "mock"
+    workers = 100
+    supports_prefix = True
+
+    def continue_prefix(self, messages, prefix):
+        return messages + [{"role": "assistant", "content": prefix, "partial": True}], {}
+
+PROVIDERS = {cls.name: cls for cls in (DashScopeProvider, OpenAIProvider, VLLMProvider, MockProvider)}
+
+def get_provider(name, **overrides):
+    if name not in PROVIDERS:
+        raise ValueError(f"Unknown provider '{name}' (available: {', '.join(sorted(PROVIDERS))})")
+    return PROVIDERS[name](**overrides)
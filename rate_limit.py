@@ -0,0 +1,153 @@
+import time
+import random
+import asyncio
+import email.utils
+import contextlib
+
+# 桶容量只留约 1 秒的突发：服务端多按滑动窗口计数，装满一分钟的桶会在开头超发一整分钟的量
+BURST_SECONDS = 1.0
+
+class TokenBucket:
+    """
+    Async token bucket refilled continuously at `per_minute` units per minute,
+    holding about BURST_SECONDS of burst. `per_minute=None` disables it.
+    The level may go negative (a request larger than the burst, or actual
+    token usage above the estimate); later acquires then wait off the debt,
+    so the long-run rate never exceeds the limit.
+    """
+    def __init__(self, per_minute=None):
+        self.rate = per_minute / 60.0 if per_minute else None
+        self.capacity = max(1.0, (self.rate or 0) * BURST_SECONDS)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount=1.0):
+        if self.rate is None:
+            return
+        # 单次请求超过桶容量时只等到桶满，再记成负债
+        threshold = min(amount, self.capacity)
+        async with self.lock:
+            while True:
+                self._refill()
+                if self.level >= threshold:
+                    self.level -= amount
+                    return
+                await asyncio.sleep((threshold - self.level) / self.rate)
+
+    def adjust(self, delta):
+        """Return (delta > 0) or charge (delta < 0) units after the fact."""
+        if self.rate is None:
+            return
+        self._refill()
+        self.level = min(self.capacity, self.level + delta)
+
+class AdaptiveConcurrency:
+    """
+    AIMD concurrency limit: +1 slot after `limit` consecutive successes,
+    halved on every rate-limit error (at most once per cool-down window).
+    """
+    def __init__(self, initial, minimum=1, maximum=None):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum or initial * 4
+        self.in_flight = 0
+        self.condition = asyncio.Condition()
+        self.last_decrease = 0.0
+
+    async def acquire(self):
+        async with self.condition:
+            await self.condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+    async def release(self):
+        async with self.condition:
+            self.in_flight -= 1
+            self.condition.notify_all()
+
+    async def on_success(self):
+        async with self.condition:
+            self.limit = min(self.maximum, self.limit + 1.0 / max(1.0, self.limit))
+            self.condition.notify_all()
+
+    def on_rate_limit(self, cooldown=1.0):
+        # 同一波 429 往往成批返回，只按一次减半
+        now = time.monotonic()
+        if now - self.last_decrease >= cooldown:
+            self.limit = max(self.minimum, self.limit / 2)
+            self.last_decrease = now
+
+def backoff_delay(attempt, base=1.0, cap=60.0):
+    """Exponential backoff with full jitter."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+def parse_retry_after(headers):
+    """Seconds to wait from Retry-After / retry-after-ms headers, or None."""
+    if not headers:
+        return None
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000.0
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    # HTTP-date 形式；格式不对（如 "soon"）就返回 None，交给 backoff_delay
+    try:
+        parsed = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, parsed.timestamp() - time.time()) if parsed else None
+
+class RateLimiter:
+    """
+    Client-side scheduler for one API endpoint: requests-per-minute and
+    tokens-per-minute buckets, an AIMD concurrency limit, and a shared
+    pause so every worker waits out a Retry-After together.
+    """
+    def __init__(self, concurrency, rpm=None, tpm=None, max_concurrency=None):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.concurrency = AdaptiveConcurrency(concurrency, maximum=max_concurrency)
+        self.paused_until = 0.0
+
+    @contextlib.asynccontextmanager
+    async def slot(self, estimated_tokens=0):
+        await self.concurrency.acquire()
+        try:
+            while True:
+                wait = self.paused_until - time.monotonic()
+                if wait <= 0:
+                    break
+                await asyncio.sleep(wait)
+            await self.requests.acquire(1)
+            await self.tokens.acquire(estimated_tokens)
+            yield
+        finally:
+            await self.concurrency.release()
+
+    async def on_success(self, estimated_tokens=0, actual_tokens=None):
+        if actual_tokens is not None:
+            self.tokens.adjust(estimated_tokens - actual_tokens)
+        await self.concurrency.on_success()
+
+    def on_rate_limit(self, retry_after=None, attempt=0):
+        delay = retry_after if retry_after is not None else backoff_delay(attempt)
+        self.paused_until = max(self.paused_until, time.monotonic() + delay)
+        self.concurrency.on_rate_limit()
+        return delay
+
+    @property
+    def limit(self):
+        return int(self.concurrency.limit)
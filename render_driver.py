@@ -0,0 +1,94 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import subprocess
+
+from packing import SOURCE_ROOT_DIR, find_document_folders
+
+BLENDER_BINARY = "./blender/blender"
+BLENDER_SCRIPT = "blenderprocess_.py"
+RENDER_OUTPUT_DIR = os.path.abspath("final_renders")
+QUEUE_DIR_NAME = ".render_queue"
+# 与 blenderprocess_.py 的 OUTPUT_EXTENSIONS 一致（那边依赖 bpy，这里不能直接导入）
+OUTPUT_EXTENSIONS = {'PNG': '.png', 'JPEG': '.jpg', 'WEBP': '.webp'}
+
+def get_args():
+    parser = argparse.ArgumentParser(description="Run K Blender render workers over one shared task list")
+    parser.add_argument('--blender', type=str, default=BLENDER_BINARY, help='Path to the Blender executable')
+    parser.add_argument('--workers', type=int, default=1, help='Number of concurrent Blender processes')
+    parser.add_argument('--mode', choices=['queue', 'shard'], default='queue', help='queue: workers claim documents via lock files; shard: static round-robin split')
+    parser.add_argument('--threads_per_worker', type=int, default=None, help='Cycles CPU threads per worker (default: cores / workers)')
+    parser.add_argument('--source_root', type=str, default=SOURCE_ROOT_DIR, help='Root directory of group_N_pieces/<doc> folders')
+    parser.add_argument('--output_dir', type=str, default=RENDER_OUTPUT_DIR, help='Directory for final renders')
+    parser.add_argument('--output_format', choices=sorted(OUTPUT_EXTENSIONS), default='PNG', help='Render file format; also decides which files count as done')
+    parser.add_argument('--log_dir', type=str, default='render_logs', help='Per-worker Blender logs')
+    # 其余未识别的参数原样转发给 blenderprocess_.py（例如 --persistent_scene）
+    return parser.parse_known_args()
+
+def main():
+    args, blender_args = get_args()
+    # 允许 "render_driver.py ... -- --output_size 2048" 的写法：命令里已经有一个 "--"，
+    # 再转发一个会被 blenderprocess_.py 的 argparse 当成未识别参数
+    if blender_args[:1] == ["--"]:
+        blender_args = blender_args[1:]
+    if not os.path.exists(args.source_root):
+        print(f"Directory {args.source_root} not found.")
+        sys.exit(1)
+
+    # 任务列表只构建一次，所有 worker 共享
+    ext = OUTPUT_EXTENSIONS[args.output_format]
+    tasks = [
+        (path, name) for path, name in find_document_folders(args.source_root)
+        if not os.path.exists(os.path.join(args.output_dir, f"{name}{ext}"))
+    ]
+    print(f"Remaining documents: {len(tasks)} | Workers: {args.workers} | Mode: {args.mode}")
+    if not tasks:
+        print("All renders are already completed!")
+        return
+
+    # 每次启动都重建队列目录：上一轮崩溃留下的认领文件不再有效
+    queue_dir = os.path.join(args.output_dir, QUEUE_DIR_NAME)
+    shutil.rmtree(queue_dir, ignore_errors=True)
+    claim_dir = os.path.join(queue_dir, "claims")
+    os.makedirs(claim_dir)
+    os.makedirs(args.log_dir, exist_ok=True)
+    task_file = os.path.join(queue_dir, "tasks.json")
+    with open(task_file, 'w', encoding='utf-8') as f:
+        json.dump(tasks, f)
+
+    workers = max(1, min(args.workers, len(tasks)))
+    threads = args.threads_per_worker or max(1, (os.cpu_count() or 1) // workers)
+
+    procs = []
+    start_time = time.time()
+    for k in range(workers):
+        cmd = [args.blender, "-b", "-t", str(threads), "-P", BLENDER_SCRIPT, "--",
+               "--task_file", task_file, "--output_dir", args.output_dir, "--output_format", args.output_format]
+        if args.mode == 'queue':
+            cmd += ["--claim_dir", claim_dir]
+        else:
+            cmd += ["--shard_index", str(k), "--num_shards", str(workers)]
+        cmd += blender_args
+        log_path = os.path.join(args.log_dir, f"worker_{k}.log")
+        log_file = open(log_path, 'w', encoding='utf-8')
+        procs.append((k, subprocess.Popen(cmd, stdout=log_file, stderr=subprocess.STDOUT), log_file, log_path))
+        print(f"[W{k}] started (log: {log_path})")
+
+    failed_workers = 0
+    for k, proc, log_file, log_path in procs:
+        code = proc.wait()
+        log_file.close()
+        if code != 0:
+            failed_workers += 1
+            print(f"❌ [W{k}] exited with code {code}, see {log_path}")
+
+    done = sum(os.path.exists(os.path.join(args.output_dir, f"{name}{ext}")) for _, name in tasks)
+    print(f"\nRendered {done}/{len(tasks)} documents in {time.time() - start_time:.1f} seconds.")
+    if failed_workers or done < len(tasks):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
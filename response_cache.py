@@ -0,0 +1,99 @@
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+
+DEFAULT_CACHE_PATH = "inference_cache.sqlite"
+DEFAULT_MAX_MB = 1024
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def make_key(model, prompt, image_sha256, params=None):
+    """Content address of one request: model, prompt, image bytes and decoding params."""
+    payload = json.dumps({
+        'model': model, 'prompt': prompt, 'image': image_sha256, 'params': params or {},
+    }, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class ResponseCache:
+    """
+    SQLite store of raw model responses (answer, thinking tokens, usage),
+    zlib-compressed and evicted least-recently-used once the stored bytes
+    exceed `max_mb`.
+    """
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_mb=DEFAULT_MAX_MB):
+        self.path = path
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model TEXT,
+                content BLOB,
+                reasoning BLOB,
+                usage TEXT,
+                size INTEGER,
+                created REAL,
+                last_access REAL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON responses(last_access)")
+        self.conn.commit()
+        self.total_bytes = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def get(self, key):
+        row = self.conn.execute("SELECT content, reasoning, usage FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        self.conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key))
+        self.conn.commit()
+        content, reasoning, usage = row
+        return {
+            'content': zlib.decompress(content).decode('utf-8'),
+            'reasoning': zlib.decompress(reasoning).decode('utf-8') if reasoning is not None else None,
+            'usage': json.loads(usage) if usage else None,
+        }
+
+    def put(self, key, model, content, reasoning=None, usage=None):
+        content_blob = zlib.compress(content.encode('utf-8'))
+        reasoning_blob = zlib.compress(reasoning.encode('utf-8')) if reasoning else None
+        usage_text = json.dumps(usage) if usage else None
+        size = len(content_blob) + len(reasoning_blob or b"") + len(usage_text or "")
+        now = time.time()
+        old = self.conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+        self.conn.execute(
+            "INSERT OR REPLACE INTO responses (key, model, content, reasoning, usage, size, created, last_access) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (key, model, content_blob, reasoning_blob, usage_text, size, now, now),
+        )
+        self.total_bytes += size - (old[0] if old else 0)
+        if self.total_bytes > self.max_bytes:
+            self._evict()
+        self.conn.commit()
+
+    def _evict(self):
+        # 一次清到上限的 90%，避免每次写入都触发淘汰
+        target = self.max_bytes * 0.9
+        rows = self.conn.execute("SELECT key, size FROM responses ORDER BY last_access").fetchall()
+        evicted = []
+        for key, size in rows:
+            if self.total_bytes <= target:
+                break
+            evicted.append((key,))
+            self.total_bytes -= size
+        self.conn.executemany("DELETE FROM responses WHERE key = ?", evicted)
+
+    def stats(self):
+        count = self.conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        return count, self.total_bytes
+
+    def close(self):
+        self.conn.close()
@@ -1,7 +1,10 @@
 #!/bin/bash
 
 PREPROCESS_SCRIPT="preprocess_.py"
+PACKING_SCRIPT="packing.py"
 BLENDER_SCRIPT="blenderprocess_.py"
+RENDER_DRIVER="render_driver.py"
+BLENDER_WORKERS="${BLENDER_WORKERS:-1}"
 
 if [[ ! -f "$PREPROCESS_SCRIPT" ]]; then
     echo "Error: Script $PREPROCESS_SCRIPT not found."
@@ -14,7 +17,7 @@ if [[ ! -f "$BLENDER_SCRIPT" ]]; then
 fi
 
 echo "--------------------------------------"
-echo "[1/2] Starting preprocessing phase..."
+echo "[1/3] Starting preprocessing phase..."
 echo "--------------------------------------"
 
 python "$PREPROCESS_SCRIPT"
@@ -28,10 +31,24 @@ fi
 
 echo ""
 echo "--------------------------------------"
-echo "[2/2] Starting Blender processing phase..."
+echo "[2/3] Computing fragment layouts..."
 echo "--------------------------------------"
 
-CUDA_VISIBLE_DEVICES=1 ./blender/blender -b -P "$BLENDER_SCRIPT"
+python "$PACKING_SCRIPT"
+
+if [ $? -eq 0 ]; then
+    echo "✅ Layouts complete."
+else
+    echo "❌ Layout computation failed. Aborting."
+    exit 1
+fi
+
+echo ""
+echo "--------------------------------------"
+echo "[3/3] Starting Blender processing phase..."
+echo "--------------------------------------"
+
+CUDA_VISIBLE_DEVICES=1 python "$RENDER_DRIVER" --blender ./blender/blender --workers "$BLENDER_WORKERS"
 
 if [ $? -eq 0 ]; then
     echo "✅ Blender processing completed successfully!"
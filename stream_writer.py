@@ -0,0 +1,105 @@
+import os
+import json
+import time
+
+class StreamCheckpoint:
+    """
+    Incremental writer for one streamed generation. Answer and thinking
+    deltas are appended to `<output>.partial` / `<output>.thinking.partial`
+    as they arrive; `<output>.meta.json` records status, time-to-first-token,
+    latency and token counts. A generation that dies mid-stream keeps its
+    partial files and is marked 'interrupted' instead of vanishing.
+    """
+    def __init__(self, output_path):
+        self.output_path = output_path
+        self.partial_path = output_path + ".partial"
+        self.thinking_path = output_path + ".thinking.partial"
+        self.meta_path = output_path + ".meta.json"
+        self.meta = {}
+        self.content_file = None
+        self.thinking_file = None
+
+    def previous(self):
+        """Meta of an earlier run, with the status fixed up to 'interrupted' if it died while streaming."""
+        if not os.path.exists(self.meta_path):
+            return None
+        try:
+            with open(self.meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if meta.get('status') == 'streaming':
+            meta['status'] = 'interrupted'
+            meta.setdefault('error', 'process exited while streaming')
+        return meta
+
+    def load_partial(self):
+        if not os.path.exists(self.partial_path):
+            return ""
+        with open(self.partial_path, 'r', encoding='utf-8') as f:
+            return f.read()
+
+    def _write_meta(self):
+        tmp_path = f"{self.meta_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.meta, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.meta_path)
+
+    def begin(self, model, attempt, resume_prefix=""):
+        os.makedirs(os.path.dirname(self.output_path) or ".", exist_ok=True)
+        previous = self.previous() or {}
+        mode = 'a' if resume_prefix else 'w'
+        self.content_file = open(self.partial_path, mode, encoding='utf-8')
+        self.thinking_file = open(self.thinking_path, mode, encoding='utf-8')
+        self.started = time.perf_counter()
+        self.meta = {
+            'status': 'streaming', 'model': model, 'attempt': attempt,
+            'interruptions': previous.get('interruptions', 0) + (previous.get('status') == 'interrupted'),
+            'resumed_chars': len(resume_prefix),
+            'started_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'ttft': None, 'ttft_content': None, 'latency': None,
+            'content_chunks': 0, 'reasoning_chunks': 0, 'content_chars': len(resume_prefix), 'reasoning_chars': 0,
+            'usage': None, 'error': None,
+        }
+        self._write_meta()
+
+    def on_delta(self, content=None, reasoning=None):
+        elapsed = round(time.perf_counter() - self.started, 3)
+        if self.meta['ttft'] is None:
+            self.meta['ttft'] = elapsed
+            # 首个 token 到达时落一次盘，崩溃后也能看到 TTFT
+            self._write_meta()
+        if reasoning:
+            self.thinking_file.write(reasoning)
+            self.thinking_file.flush()
+            self.meta['reasoning_chunks'] += 1
+            self.meta['reasoning_chars'] += len(reasoning)
+        if content:
+            if self.meta['ttft_content'] is None:
+                self.meta['ttft_content'] = elapsed
+            self.content_file.write(content)
+            self.content_file.flush()
+            self.meta['content_chunks'] += 1
+            self.meta['content_chars'] += len(content)
+
+    def _close(self, status, usage=None, error=None):
+        for f in (self.content_file, self.thinking_file):
+            if f is not None:
+                f.close()
+        self.content_file = self.thinking_file = None
+        self.meta.update({
+            'status': status, 'latency': round(time.perf_counter() - self.started, 3),
+            'usage': usage, 'error': error,
+        })
+        self._write_meta()
+
+    def finish(self, usage=None):
+        """Mark the generation complete; the caller writes the final .md."""
+        self._close('complete', usage)
+        for path in (self.partial_path, self.thinking_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def fail(self, error):
+        """Keep the partial files and flag the generation as interrupted."""
+        self._close('interrupted', error=str(error) or type(error).__name__)
@@ -1,47 +1,122 @@
 import os
+import io
+import argparse
 import subprocess
+import concurrent.futures
+from PIL import Image
 
 INPUT_DIR = "final_renders"
 OUTPUT_DIR = "final_result"
+INPUT_EXTENSIONS = ('.png',)
+DEFAULT_QUALITY = 95
+# 默认保持原分辨率（基准图像不变）；推理客户端本身按 2048 缩放，需要更小的文件时可传 --max_size 2048
+DEFAULT_MAX_SIZE = 0
+MIN_QUALITY = 40
 
-if not os.path.exists(OUTPUT_DIR):
-    os.makedirs(OUTPUT_DIR)
-    print(f"已创建输出目录: {OUTPUT_DIR}")
+def get_args():
+    parser = argparse.ArgumentParser(description="Convert final renders to JPEG in parallel")
+    parser.add_argument('--input_dir', type=str, default=INPUT_DIR, help='Directory of rendered PNGs (searched recursively)')
+    parser.add_argument('--output_dir', type=str, default=OUTPUT_DIR, help='Mirrored output directory for JPEGs')
+    parser.add_argument('--backend', choices=['pillow', 'ffmpeg'], default='pillow', help='pillow: in-process libjpeg(-turbo); ffmpeg: one subprocess per file')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Number of worker processes')
+    parser.add_argument('--quality', type=int, default=DEFAULT_QUALITY, help='JPEG quality (1-95); upper bound when --max_kb is set')
+    parser.add_argument('--max_kb', type=int, default=None, help='Target file size; quality is lowered until the JPEG fits (pillow only)')
+    parser.add_argument('--max_size', type=int, default=DEFAULT_MAX_SIZE, help='Downscale so the longer side is at most this many pixels; 0 (default) keeps full resolution, 2048 matches the inference payload size')
+    parser.add_argument('--overwrite', action='store_true', help='Re-encode even if the output is newer than its source')
+    return parser.parse_args()
+
+def is_up_to_date(input_path, output_path):
+    return os.path.exists(output_path) and os.path.getmtime(output_path) >= os.path.getmtime(input_path)
+
+def encode_jpeg(img, quality, max_kb=None):
+    buffer = io.BytesIO()
+    img.save(buffer, format="JPEG", quality=quality)
+    if max_kb is None or buffer.tell() <= max_kb * 1024:
+        return buffer.getvalue()
+    # 二分查找满足体积上限的最高质量
+    best = None
+    lo, hi = MIN_QUALITY, quality - 1
+    while lo <= hi:
+        mid = (lo + hi) // 2
+        buffer = io.BytesIO()
+        img.save(buffer, format="JPEG", quality=mid)
+        if buffer.tell() <= max_kb * 1024:
+            best, lo = buffer.getvalue(), mid + 1
+        else:
+            hi = mid - 1
+    return best if best is not None else buffer.getvalue()
+
+def convert_pillow(input_path, tmp_path, quality, max_kb, max_size):
+    with Image.open(input_path) as img:
+        img = img.convert('RGB')
+        if max_size and max(img.size) > max_size:
+            ratio = max_size / max(img.size)
+            new_size = (int(img.width * ratio), int(img.height * ratio))
+            img = img.resize(new_size, Image.Resampling.LANCZOS, reducing_gap=3.0)
+        data = encode_jpeg(img, quality, max_kb)
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+
+def convert_ffmpeg(input_path, tmp_path, quality, max_size):
+    # ffmpeg 的 -q:v 取值 2(最好)~31，按质量线性映射：95 -> 3，与旧脚本一致
+    qscale = max(2, min(31, round(31 - quality * 0.29)))
+    cmd = ["ffmpeg", "-y", "-i", input_path]
+    if max_size:
+        cmd += ["-vf", f"scale='if(gt(iw,ih),min(iw,{max_size}),-2)':'if(gt(iw,ih),-2,min(ih,{max_size}))':flags=lanczos"]
+    cmd += ["-q:v", str(qscale), "-loglevel", "error", "-f", "image2", "-c:v", "mjpeg", tmp_path]
+    subprocess.run(cmd, check=True)
+
+def convert_worker(task):
+    input_path, output_path, backend, quality, max_kb, max_size = task
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    # 先写临时文件再替换，中断后不会留下半张 JPEG 被误判为最新
+    tmp_path = f"{output_path}.{os.getpid()}.tmp"
+    try:
+        if backend == 'ffmpeg':
+            convert_ffmpeg(input_path, tmp_path, quality, max_size)
+        else:
+            convert_pillow(input_path, tmp_path, quality, max_kb, max_size)
+        os.replace(tmp_path, output_path)
+        return f"[Done] {output_path} ({os.path.getsize(output_path) // 1024} KB)"
+    except FileNotFoundError as e:
+        return f"[Fail] {input_path}: {e} (is ffmpeg installed?)" if backend == 'ffmpeg' else f"[Fail] {input_path}: {e}"
+    except Exception as e:
+        return f"[Fail] {input_path}: {e}"
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
 
 def main():
-    files = [f for f in os.listdir(INPUT_DIR) if f.lower().endswith(".png")]
-    total = len(files)
-    
-    if total == 0:
-        print("❌ 没有在 final_renders 下找到 PNG 文件")
+    args = get_args()
+    if args.max_kb and args.backend == 'ffmpeg':
+        print("⚠️ --max_kb 仅支持 pillow 后端，将忽略")
+
+    files = sorted(
+        os.path.relpath(os.path.join(root, f), args.input_dir)
+        for root, dirs, names in os.walk(args.input_dir) for f in names if f.lower().endswith(INPUT_EXTENSIONS)
+    )
+    if not files:
+        print(f"❌ 没有在 {args.input_dir} 下找到 PNG 文件")
         return
 
-    print(f"找到 {total} 张图片，开始压缩...")
-
-    for i, filename in enumerate(files):
-        input_path = os.path.join(INPUT_DIR, filename)
-        name_no_ext = os.path.splitext(filename)[0]
-        output_filename = f"{name_no_ext}.jpg"
-        output_path = os.path.join(OUTPUT_DIR, output_filename)
-        cmd = [
-            "ffmpeg", "-y",
-            "-i", input_path,
-            "-q:v", "3",
-            "-loglevel", "error", 
-            output_path
-        ]
-        
-        print(f"[{i+1}/{total}] 正在压缩: {filename} -> {output_filename}")
-        
-        try:
-            subprocess.run(cmd, check=True)
-        except subprocess.CalledProcessError:
-            print(f"❌ 压缩失败: {filename}")
-        except FileNotFoundError:
-            print("❌ 错误: 未找到 ffmpeg，请确保已安装并添加到系统环境变量。")
-            return
-
-    print(f"\n✅ 全部完成！压缩后的图片在 {OUTPUT_DIR} 文件夹中。")
+    tasks = []
+    skipped_count = 0
+    for filename in files:
+        input_path = os.path.join(args.input_dir, filename)
+        output_path = os.path.join(args.output_dir, f"{os.path.splitext(filename)[0]}.jpg")
+        if not args.overwrite and is_up_to_date(input_path, output_path):
+            skipped_count += 1
+            continue
+        tasks.append((input_path, output_path, args.backend, args.quality, args.max_kb, args.max_size))
+
+    print(f"找到 {len(files)} 张图片 | 跳过 (已是最新) {skipped_count} | 待压缩 {len(tasks)} | 后端 {args.backend} | {args.workers} 个进程")
+    failed = 0
+    with concurrent.futures.ProcessPoolExecutor(max_workers=args.workers) as executor:
+        for i, result in enumerate(executor.map(convert_worker, tasks, chunksize=2)):
+            failed += result.startswith("[Fail]")
+            print(f"[{i+1}/{len(tasks)}] {result}")
+
+    print(f"\n✅ 全部完成！失败 {failed} 张，压缩后的图片在 {args.output_dir} 文件夹中。")
 
 if __name__ == "__main__":
     main()